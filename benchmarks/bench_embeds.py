@@ -0,0 +1,142 @@
+"""Micro-benchmark for the embed template layer in utils/embeds.py
+
+Compares the per-call cost of the templated builders against the original
+build-from-scratch versions (copied below) and checks both produce the same
+embed. Run from the repository root:
+
+    python -m benchmarks.bench_embeds [iterations]
+"""
+import datetime
+import sys
+import timeit
+from types import SimpleNamespace
+
+import discord
+
+from utils import embeds
+
+# ----- Original builders, kept here as the "before" baseline -----
+
+def legacy_balance_embed(user, balance):
+    embed = discord.Embed(
+        title="💰 Wallet Balance",
+        description=f"{user.mention}, you have **{balance:,}** coins in your wallet.",
+        color=discord.Color.gold()
+    )
+    embed.set_thumbnail(url=user.display_avatar.url)
+    embed.set_footer(text="Earn more coins by chatting and claiming daily rewards!")
+    embed.timestamp = datetime.datetime.now()
+    return embed
+
+def legacy_shop_embed():
+    embed = discord.Embed(
+        title="🛍️ BitBuddy Shop",
+        description="Buy special roles with your coins!",
+        color=discord.Color.blurple()
+    )
+    embed.add_field(
+        name="How to buy",
+        value="Select an item from the dropdown menu below to purchase it.",
+        inline=False
+    )
+    embed.add_field(
+        name="Earning coins",
+        value="• Chat in the server to earn 10-50 coins per message\n• Claim daily rewards (up to 6,000 coins with streak!)\n• Standard roles cost 50,000 coins\n• VIP role costs 100,000 coins",
+        inline=False
+    )
+    embed.add_field(
+        name="Time to earn",
+        value="With regular activity, you can earn a standard role in about 2 weeks and the VIP role in about a month. Stay active!",
+        inline=False
+    )
+    embed.set_footer(text="Prices are subject to change.")
+    return embed
+
+def legacy_catalog_embed(item_count):
+    embed = discord.Embed(
+        title="🏪 Shop",
+        description="Welcome to the shop! Use the dropdown menu below to browse and purchase items.",
+        color=discord.Color.blue()
+    )
+    embed.add_field(
+        name="How to Shop",
+        value="1. Select an item from the dropdown menu\n2. Review the item details\n3. Click Confirm to purchase or Cancel to abort",
+        inline=False
+    )
+    embed.add_field(
+        name="Available Items",
+        value=f"There are currently {item_count} items available for purchase.",
+        inline=False
+    )
+    embed.set_footer(text="All purchases are final. Please ensure you have enough points before confirming.")
+    return embed
+
+def legacy_purchase_embed(item_name, price, success=True):
+    if success:
+        embed = discord.Embed(
+            title="✅ Purchase Successful!",
+            description=f"You have successfully purchased **{item_name}** for **{price:,}** coins!",
+            color=discord.Color.green()
+        )
+        embed.set_footer(text="Enjoy your new role!")
+    else:
+        embed = discord.Embed(
+            title="❌ Purchase Failed",
+            description=f"You don't have enough coins to purchase **{item_name}** ({price:,} coins).",
+            color=discord.Color.red()
+        )
+        embed.set_footer(text="Keep chatting to earn more coins!")
+    return embed
+
+def legacy_daily_reward_embed(amount, streak):
+    if streak > 1:
+        title = f"🎁 Daily Reward Claimed! (Streak: {streak} days)"
+        description = f"You've received **{amount:,}** coins for your daily activity!"
+        footer = f"Come back tomorrow to keep your streak going!"
+    else:
+        title = "🎁 Daily Reward Claimed!"
+        description = f"You've received **{amount:,}** coins for your daily activity!"
+        footer = "Come back tomorrow to start a streak for bonus rewards!"
+
+    embed = discord.Embed(
+        title=title,
+        description=description,
+        color=discord.Color.green()
+    )
+    embed.add_field(
+        name="Streak Rewards",
+        value="Keep your streak going for even more coins each day!",
+        inline=False
+    )
+    embed.set_footer(text=footer)
+    return embed
+
+# ----- Benchmark -----
+
+USER = SimpleNamespace(mention="<@1234>", display_avatar=SimpleNamespace(url="https://cdn.discordapp.com/avatars/1234/a.png"))
+
+CASES = [
+    ("balance", lambda: legacy_balance_embed(USER, 123456), lambda: embeds.create_balance_embed(USER, 123456)),
+    ("shop", legacy_shop_embed, embeds.create_shop_embed),
+    ("catalog", lambda: legacy_catalog_embed(7), lambda: embeds.create_catalog_embed(7)),
+    ("purchase", lambda: legacy_purchase_embed("🪼Furina", 50000), lambda: embeds.create_purchase_embed("🪼Furina", 50000)),
+    ("daily_reward", lambda: legacy_daily_reward_embed(2400, 6), lambda: embeds.create_daily_reward_embed(2400, 6)),
+]
+
+def comparable(embed):
+    data = embed.to_dict()
+    data.pop("timestamp", None)
+    return data
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    print(f"{'embed':<14}{'before (µs)':>14}{'after (µs)':>14}{'speedup':>10}")
+    for name, before, after in CASES:
+        assert comparable(before()) == comparable(after()), f"{name}: templated embed differs from the original"
+        before_us = min(timeit.repeat(before, number=iterations, repeat=3)) / iterations * 1e6
+        after_us = min(timeit.repeat(after, number=iterations, repeat=3)) / iterations * 1e6
+        print(f"{name:<14}{before_us:>14.2f}{after_us:>14.2f}{before_us / after_us:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""End-to-end benchmark for the message earning path
+
+Drives main.on_message (accrual, and bot.process_commands for messages in
+the command channel) and DailyRewards.on_message with fake members and
+messages against a generated database, without connecting to Discord.
+Reports messages/sec, p50/p99 handler latency and database commits/sec.
+Run from the repository root:
+
+    python -m benchmarks.bench_message_flood --users 100000 --messages 50000
+
+Use --users 1000000 for a production-sized database; generated databases are
+reused when --db points at an existing file that is large enough.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from benchmarks import harness
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000, help="users in the generated database (10k-1M)")
+    parser.add_argument("--active", type=int, default=5_000, help="distinct users sending messages")
+    parser.add_argument("--messages", type=int, default=50_000, help="messages to send")
+    parser.add_argument("--command-ratio", type=float, default=0.02, help="share of messages that are !balance/!daily commands")
+    parser.add_argument("--concurrency", type=int, default=1, help="messages handled concurrently, like a burst of gateway events")
+    parser.add_argument("--db", help="database file (default: a temporary file)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+def build_workload(args):
+    """Pre-build every fake message so the timed loop only runs bot code"""
+    rng = random.Random(args.seed)
+    active = min(args.active, args.users)
+    members = [harness.make_member(harness.user_id(i)) for i in rng.sample(range(args.users), active)]
+    messages = []
+    for _ in range(args.messages):
+        author = rng.choice(members)
+        if rng.random() < args.command_ratio:
+            content = rng.choice(("!balance", "!daily"))
+            messages.append(harness.make_message(author, harness.COMMAND_CHANNEL_ID, content))
+        else:
+            messages.append(harness.make_message(author, harness.POINTS_CHANNEL_ID))
+    return messages
+
+async def run(main, daily, messages, concurrency):
+    latencies = []
+
+    async def handle(message):
+        # The gateway dispatches both listeners for every message
+        start = time.perf_counter()
+        await main.on_message(message)
+        await daily.on_message(message)
+        latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    for i in range(0, len(messages), concurrency):
+        batch = messages[i:i + concurrency]
+        if concurrency == 1:
+            await handle(batch[0])
+        else:
+            await asyncio.gather(*(handle(message) for message in batch))
+    await main.ledger.flush()  # Count the tail of buffered earnings as part of the run
+    return time.perf_counter() - started, latencies
+
+async def amain(args, db_path):
+    print(f"Preparing {args.users:,} users in {db_path}...")
+    started = time.perf_counter()
+    harness.populate_users(db_path, args.users, args.seed)
+    print(f"Database ready in {time.perf_counter() - started:.1f}s")
+
+    main = harness.bootstrap(db_path)
+    recorder = harness.SendRecorder()
+    harness.stub_context_send(recorder)
+    messages = build_workload(args)
+
+    async with main.bot:
+        await harness.claim_guild(main)
+        from utils.daily_rewards import DailyRewards
+        await main.bot.add_cog(DailyRewards(main.bot))
+        daily = main.bot.get_cog("DailyRewards")
+        main.flush_accruals.start()
+
+        commits = harness.CommitCounter(main.db)
+        elapsed, latencies = await run(main, daily, messages, args.concurrency)
+        commits.detach()
+
+        # One pass of the minute loop over everyone the flood made active
+        tracked = len(daily.activity)
+        started = time.perf_counter()
+        await daily.check_activity()
+        check_activity_ms = (time.perf_counter() - started) * 1000
+
+        main.flush_accruals.cancel()
+        summary = harness.latency_summary(latencies)
+        print()
+        print(f"users {args.users:,}  active {min(args.active, args.users):,}  "
+              f"messages {len(messages):,}  concurrency {args.concurrency}  command ratio {args.command_ratio:g}")
+        print(f"{'messages/sec':<24}{len(messages) / elapsed:>12,.0f}")
+        print(f"{'handler p50 (ms)':<24}{summary['p50']:>12.3f}")
+        print(f"{'handler p99 (ms)':<24}{summary['p99']:>12.3f}")
+        print(f"{'handler max (ms)':<24}{summary['max']:>12.3f}")
+        print(f"{'commits':<24}{commits.commits:>12,}")
+        print(f"{'commits/sec':<24}{commits.commits / elapsed:>12,.1f}")
+        print(f"{'command replies':<24}{recorder.sent:>12,}")
+        print(f"{'check_activity (ms)':<24}{check_activity_ms:>12.2f}  ({tracked:,} tracked users)")
+        print(f"{'balance cache hit rate':<24}{main.ledger.stats()['hit_rate']:>12.1%}")
+    main.db.close()
+
+def main():
+    args = parse_args()
+    temporary = args.db is None
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="bitbuddy-bench-"), "bench.db")
+    try:
+        asyncio.run(amain(args, db_path))
+    finally:
+        if temporary:
+            harness.remove_database(db_path)
+            os.rmdir(os.path.dirname(db_path))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""Contention benchmark for shop purchases
+
+Fires hundreds of concurrent ConfirmPurchase.confirm clicks (including
+double clicks on the same view), !admin addcoins calls and message accruals
+at a small set of hot users, with stubbed interactions and a local SQLite
+file. Optional external writers hold the database lock from their own
+connections, like the update_prices.py CLI or a backup would.
+
+Reports throughput, time spent waiting for the writer and the SQLite lock,
+the "database is locked" error rate, and checks every final balance against
+the operations that succeeded (no double spends, no lost updates).
+Run from the repository root:
+
+    python -m benchmarks.bench_purchase_contention --users 50 --purchases 500
+"""
+import argparse
+import asyncio
+import collections
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+from benchmarks import harness
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50, help="hot users every operation targets")
+    parser.add_argument("--purchases", type=int, default=500, help="purchase confirmations (one view each)")
+    parser.add_argument("--clicks", type=int, default=3, help="clicks per confirmation view (double clicks)")
+    parser.add_argument("--addcoins", type=int, default=300, help="!admin addcoins calls")
+    parser.add_argument("--messages", type=int, default=5000, help="accruing messages")
+    parser.add_argument("--start-balance", type=int, default=120_000)
+    parser.add_argument("--api-latency", type=float, default=0.02, help="seconds add_roles takes, like a REST call")
+    parser.add_argument("--external-writers", type=int, default=1, help="threads writing through their own connections")
+    parser.add_argument("--external-hold", type=float, default=0.005, help="seconds each external transaction holds the lock")
+    parser.add_argument("--db", help="database file (default: a temporary file)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+class WriterProbe:
+    """Wraps Database._submit to time how long writer jobs wait in the queue and count lock errors"""
+
+    def __init__(self, db):
+        self.db = db
+        self.waits = []
+        self.locked_errors = 0
+        self.original = db._submit
+        db._submit = self._submit
+
+    async def _submit(self, executor, label, func, *args):
+        enqueued = time.perf_counter()
+
+        def probed(*call_args):
+            if executor is self.db.executor:
+                self.waits.append(time.perf_counter() - enqueued)
+            try:
+                return func(*call_args)
+            except sqlite3.OperationalError as e:
+                if "locked" in str(e):
+                    self.locked_errors += 1
+                raise
+
+        return await self.original(executor, label, probed, *args)
+
+    def detach(self):
+        self.db._submit = self.original
+
+class ExternalWriter(threading.Thread):
+    """Takes the SQLite write lock from another connection in a loop (touches shop_items only)"""
+
+    def __init__(self, db_path, hold, busy_timeout):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.hold = hold
+        self.busy_timeout = busy_timeout
+        self.stop_event = threading.Event()
+        self.lock_waits = []
+        self.transactions = 0
+        self.locked_errors = 0
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout / 1000, isolation_level=None)
+        try:
+            while not self.stop_event.is_set():
+                started = time.perf_counter()
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                except sqlite3.OperationalError as e:
+                    if "locked" in str(e):
+                        self.locked_errors += 1
+                    continue
+                self.lock_waits.append(time.perf_counter() - started)
+                conn.execute("UPDATE shop_items SET price = price WHERE id = 1")
+                time.sleep(self.hold)
+                conn.execute("COMMIT")
+                self.transactions += 1
+                time.sleep(self.hold)  # Let the bot's writer in between
+        finally:
+            conn.close()
+
+class FakeInteraction:
+    """Records the final state a confirm click leaves the ephemeral message in"""
+
+    def __init__(self, user):
+        self.user = user
+        self.outcome = "ignored"  # Repeated clicks only defer
+        self.response = SimpleNamespace(edit_message=self.edit_message, defer=self.defer, send_message=self.send_message)
+
+    async def edit_message(self, **kwargs):
+        self.outcome = "pending"
+
+    async def defer(self):
+        self.outcome = "ignored"
+
+    async def send_message(self, *args, **kwargs):
+        self.outcome = "rejected"
+
+    async def edit_original_response(self, **kwargs):
+        embed = kwargs.get("embed")
+        if embed is not None and "Successful" in embed.title:
+            self.outcome = "completed"
+        elif embed is not None and "Failed" in embed.title:
+            self.outcome = "insufficient"
+        else:
+            self.outcome = "error"
+
+async def amain(args, db_path):
+    rng = random.Random(args.seed)
+    main = harness.bootstrap(db_path)
+    recorder = harness.SendRecorder()
+    harness.stub_context_send(recorder)
+
+    async with main.bot:
+        await harness.claim_guild(main)
+        from utils.admin_tools import AdminTools
+        from utils.shop_system import ConfirmPurchase
+        await main.bot.add_cog(AdminTools(main.bot))
+        admin = main.bot.get_cog("AdminTools")
+        main.flush_accruals.start()
+
+        catalog = await main.bot.catalog.get(harness.GUILD_ID)
+        item = catalog.items[0]
+        price = item[2]
+
+        role = SimpleNamespace(id=item[3], name="Role")
+        guild = SimpleNamespace(id=harness.GUILD_ID, get_role=lambda role_id: role)
+
+        async def add_roles(*roles):
+            await asyncio.sleep(args.api_latency)
+
+        members = []
+        for i in range(args.users):
+            member = harness.make_member(harness.user_id(i))
+            member.add_roles = add_roles
+            members.append(member)
+            await main.ledger.set_balance(harness.GUILD_ID, member.id, args.start_balance)
+
+        # Track every coin the bot is asked to move, to check balances afterwards
+        credited = collections.Counter()
+        original_accrue = main.ledger.accrue
+
+        def accrue(guild_id, user_id, amount):
+            credited[user_id] += amount
+            return original_accrue(guild_id, user_id, amount)
+
+        main.ledger.accrue = accrue
+
+        admin_member = harness.make_member(harness.user_id(10**6), administrator=True)
+        admin_ctx = SimpleNamespace(author=admin_member, guild=guild, bot=main.bot, send=recorder.send)
+        errors = collections.Counter()  # Operations that failed cleanly (reported, not a correctness problem)
+        violations = collections.Counter()  # Double spends and purchase bookkeeping mismatches
+
+        async def purchase(member):
+            view = ConfirmPurchase(item, member, guild, main.bot)
+            interactions = [FakeInteraction(member) for _ in range(args.clicks)]
+            await asyncio.gather(*(view.confirm.callback(interaction) for interaction in interactions))
+            return [interaction.outcome for interaction in interactions]
+
+        async def add_coins(member, amount):
+            try:
+                await admin.add_coins.callback(admin, admin_ctx, member, amount)
+                credited[member.id] += amount
+            except Exception:
+                errors["addcoins"] += 1
+
+        async def message(member):
+            await main.on_message(harness.make_message(member, harness.POINTS_CHANNEL_ID))
+
+        operations = (
+            [purchase(rng.choice(members)) for _ in range(args.purchases)]
+            + [add_coins(rng.choice(members), rng.randint(100, 5000)) for _ in range(args.addcoins)]
+            + [message(rng.choice(members)) for _ in range(args.messages)]
+        )
+        rng.shuffle(operations)
+
+        busy_timeout = main.db.config.busy_timeout
+        writers = [ExternalWriter(db_path, args.external_hold, busy_timeout) for _ in range(args.external_writers)]
+        for writer in writers:
+            writer.start()
+
+        probe = harness.CommitCounter(main.db)
+        writer_probe = WriterProbe(main.db)
+        started = time.perf_counter()
+        results = await asyncio.gather(*operations)
+        await main.ledger.flush()
+        elapsed = time.perf_counter() - started
+        writer_probe.detach()
+        probe.detach()
+
+        for writer in writers:
+            writer.stop_event.set()
+        for writer in writers:
+            writer.join()
+        main.flush_accruals.cancel()
+
+        # ----- Correctness -----
+        outcomes = collections.Counter()
+        for result in results:
+            if isinstance(result, list):
+                outcomes.update(result)
+                if result.count("completed") > 1:
+                    violations["double_spend_view"] += 1
+
+        purchases = collections.Counter(dict(await main.db.fetchall(
+            "SELECT user_id, COUNT(*) FROM purchases WHERE guild_id = ? AND status = 'completed' GROUP BY user_id",
+            (harness.GUILD_ID,), primary=True
+        )))
+        if sum(purchases.values()) != outcomes["completed"]:
+            violations["purchase_rows"] += 1
+
+        mismatched = 0
+        for member in members:
+            expected = args.start_balance + credited[member.id] - price * purchases[member.id]
+            stored = (await main.db.fetchone(
+                "SELECT balance FROM users WHERE guild_id = ? AND user_id = ?", (harness.GUILD_ID, member.id), primary=True
+            ))[0]
+            cached = await main.ledger.get_balance(harness.GUILD_ID, member.id)
+            if stored != expected or cached != expected or stored < 0:
+                mismatched += 1
+
+        # ----- Report -----
+        waits = harness.latency_summary(writer_probe.waits)
+        external_waits = harness.latency_summary([wait for writer in writers for wait in writer.lock_waits])
+        external_transactions = sum(writer.transactions for writer in writers)
+        external_locked = sum(writer.locked_errors for writer in writers)
+        bot_writes = len(writer_probe.waits)
+        operations_count = args.purchases * args.clicks + args.addcoins + args.messages
+
+        print(f"users {args.users}  confirmations {args.purchases} x {args.clicks} clicks  addcoins {args.addcoins}  "
+              f"messages {args.messages}  external writers {args.external_writers}")
+        print(f"{'operations/sec':<34}{operations_count / elapsed:>12,.0f}")
+        print(f"{'completed purchases/sec':<34}{outcomes['completed'] / elapsed:>12,.1f}")
+        print(f"{'click outcomes':<34}{dict(outcomes)}")
+        print(f"{'bot commits':<34}{probe.commits:>12,}")
+        print(f"{'writer queue wait p50/p99 (ms)':<34}{waits['p50']:>12.2f} / {waits['p99']:.2f}")
+        print(f"{'external lock wait p50/p99 (ms)':<34}{external_waits['p50']:>12.2f} / {external_waits['p99']:.2f}")
+        print(f"{'external transactions':<34}{external_transactions:>12,}")
+        print(f"{'database is locked (bot)':<34}{writer_probe.locked_errors:>12,}  "
+              f"({writer_probe.locked_errors / max(bot_writes, 1):.2%} of {bot_writes:,} writer jobs)")
+        print(f"{'database is locked (external)':<34}{external_locked:>12,}")
+        errors["purchase"] = outcomes["error"]
+        print(f"{'failed operations':<34}{dict(+errors) or 0}")
+        print(f"{'double spends / bookkeeping':<34}{dict(violations) or 0}")
+        print(f"{'balance mismatches':<34}{mismatched:>12,}  of {len(members)} users")
+        print("PASS" if not mismatched and not violations else "FAIL")
+    main.db.close()
+
+def main():
+    args = parse_args()
+    temporary = args.db is None
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="bitbuddy-bench-"), "bench.db")
+    if not temporary:
+        harness.remove_database(db_path)  # Balances are checked against a known starting state
+    try:
+        asyncio.run(amain(args, db_path))
+    finally:
+        if temporary:
+            harness.remove_database(db_path)
+            os.rmdir(os.path.dirname(db_path))
+
+if __name__ == "__main__":
+    main()
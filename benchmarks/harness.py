@@ -0,0 +1,147 @@
+"""Shared fakes and setup for the end-to-end benchmarks
+
+Boots main.py against a local database file without connecting to Discord:
+environment variables are set before main is imported, the gateway user is
+faked so commands can be parsed, and Context.send is replaced by a recorder
+so commands never touch the network.
+"""
+import os
+import random
+import sqlite3
+import statistics
+from types import SimpleNamespace
+
+from utils.migrations import migrate
+
+POINTS_CHANNEL_ID = 1
+COMMAND_CHANNEL_ID = 2
+BOT_USER_ID = 1
+GUILD_ID = 10
+GUILD = SimpleNamespace(id=GUILD_ID)
+
+def bootstrap(db_path):
+    """Point the bot at db_path and import main (which opens and initializes it)"""
+    os.environ.setdefault('DISCORD_TOKEN', 'benchmark')
+    os.environ['DB_PATH'] = db_path
+    os.environ['POINTS_CHANNEL_ID'] = str(POINTS_CHANNEL_ID)
+    os.environ['COMMAND_CHANNELS'] = str(COMMAND_CHANNEL_ID)
+    os.environ.setdefault('SHOP_CHANNEL_ID', '3')
+    os.environ['LEGACY_GUILD_ID'] = str(GUILD_ID)  # claim_guild() hands the sample shop items to GUILD_ID
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')  # Keep startup messages out of the report
+
+    import main
+    main.bot._connection.user = SimpleNamespace(id=BOT_USER_ID)  # get_context skips the bot's own messages
+    return main
+
+async def claim_guild(main):
+    """Give GUILD_ID the channels above and the sample shop items, like on_ready would"""
+    await main.claim_legacy_data()
+
+def remove_database(db_path):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+def populate_users(db_path, count, seed=0):
+    """Fill the users table (and a share of daily_rewards) with count synthetic users
+
+    Runs on its own connection before the bot starts. Existing data is kept if
+    the file already holds at least count users, so large databases can be reused.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        migrate(conn)  # Same schema and indexes the bot runs with
+        existing = conn.execute("SELECT COUNT(*) FROM users WHERE guild_id = ?", (GUILD_ID,)).fetchone()[0]
+        if existing >= count:
+            return existing
+
+        rng = random.Random(seed)
+        with conn:
+            for start in range(existing, count, 50000):
+                ids = range(user_id(start), user_id(min(start + 50000, count)))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO users (guild_id, user_id, balance) VALUES (?, ?, ?)",
+                    ((GUILD_ID, uid, rng.randint(0, 200000)) for uid in ids)
+                )
+                conn.executemany(
+                    # Last claimed 2000-01-01
+                    "INSERT OR IGNORE INTO daily_rewards (guild_id, user_id, last_claim, streak) VALUES (?, ?, 946684800, ?)",
+                    ((GUILD_ID, uid, rng.randint(1, 30)) for uid in ids if uid % 2 == 0)
+                )
+        return count
+    finally:
+        conn.close()
+
+def user_id(index):
+    """Synthetic users get snowflake-sized ids so they index like real ones"""
+    return 100_000_000_000_000_000 + index
+
+def make_member(uid, bot=False, administrator=False):
+    return SimpleNamespace(
+        id=uid,
+        name=f"user{uid % 100000}",
+        mention=f"<@{uid}>",
+        bot=bot,
+        display_avatar=SimpleNamespace(url=f"https://cdn.discordapp.com/avatars/{uid}/a.png"),
+        guild_permissions=SimpleNamespace(administrator=administrator),
+        roles=[]
+    )
+
+def make_message(author, channel_id, content="hello"):
+    return SimpleNamespace(
+        id=random.getrandbits(63),
+        author=author,
+        channel=SimpleNamespace(id=channel_id),
+        content=content,
+        guild=GUILD,
+        attachments=[],
+        _state=None
+    )
+
+class SendRecorder:
+    """Stands in for Context.send: counts replies instead of calling the API"""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, *args, **kwargs):
+        self.sent += 1
+        return SimpleNamespace(edit=self.edit)
+
+    async def edit(self, *args, **kwargs):
+        return None
+
+def stub_context_send(recorder):
+    from discord.ext import commands
+    commands.Context.send = recorder.send  # A bound method, so ctx is not passed
+
+class CommitCounter:
+    """Counts COMMITs on the writer connection through SQLite's trace callback"""
+
+    def __init__(self, db):
+        self.db = db
+        self.commits = 0
+        db.call(db.conn.set_trace_callback, self._trace)
+
+    def _trace(self, statement):
+        if statement == "COMMIT":
+            self.commits += 1
+
+    def detach(self):
+        self.db.call(self.db.conn.set_trace_callback, None)
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def latency_summary(latencies):
+    """{p50, p99, max, mean} in milliseconds"""
+    values = sorted(latencies)
+    return {
+        "p50": percentile(values, 0.50) * 1000,
+        "p99": percentile(values, 0.99) * 1000,
+        "max": (values[-1] if values else 0.0) * 1000,
+        "mean": (statistics.fmean(values) if values else 0.0) * 1000,
+    }
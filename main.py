@@ -1,14 +1,21 @@
 import discord
-from discord.ext import commands
-import sqlite3
+from discord.ext import commands, tasks
 import random
 import os
-import asyncio
-import time
-import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
 from dotenv import load_dotenv
-import traceback
+import time
+from utils.ledger import create_ledger
+from utils.ledger_client import LedgerClient, RemoteDatabase, RemoteLedger
+from utils.catalog import ShopCatalog
+from utils.user_resolver import UserResolver
+from utils.embeds import create_balance_embed
+from utils.database import Database, DatabaseConfig
+from utils.migrations import migrate
+from utils.guild_config import GuildConfig, GuildConfigStore
+from utils.shard_runner import recommended_shards
+from utils.health import HealthServer
+from utils import metrics
+from utils.log import get_logger, setup_logging
 
 # Try to load environment variables from .env file, but don't fail if it doesn't exist
 try:
@@ -16,241 +23,246 @@ try:
 except:
     pass  # .env file not found, will use environment variables directly
 
+# Log records are written by a background thread, LOG_LEVEL=DEBUG turns on per-command detail
+setup_logging()
+log = get_logger("main")
+
 # Create utils directory if it doesn't exist
 if not os.path.exists("utils"):
     os.makedirs("utils")
 
-# Get token and channel IDs from environment variables
+# Get token from environment variables
 TOKEN = os.getenv('DISCORD_TOKEN')
+
+# Channels are configured per guild with !admin commands. These single-guild
+# settings only seed the config of the guild that claims data from before
+# guild scoping (LEGACY_GUILD_ID, or the only guild the bot is in).
 SHOP_CHANNEL_ID = int(os.getenv('SHOP_CHANNEL_ID', '0'))
 COMMAND_CHANNELS = [int(channel_id.strip()) for channel_id in os.getenv('COMMAND_CHANNELS', '').split(',') if channel_id.strip()]
 POINTS_CHANNEL_ID = int(os.getenv('POINTS_CHANNEL_ID', '0'))
+LEGACY_GUILD_ID = int(os.getenv('LEGACY_GUILD_ID', '0'))
+
+# Sharding: SHARD_COUNT ("auto" or a number) switches to AutoShardedBot, and
+# SHARD_IDS picks this process's shards. utils.shard_runner sets both, plus
+# LEDGER_SOCKET so every process sends its writes to one ledger process.
+SHARD_COUNT = os.getenv('SHARD_COUNT', '')
+SHARD_IDS = [int(shard_id.strip()) for shard_id in os.getenv('SHARD_IDS', '').split(',') if shard_id.strip()]
+LEDGER_SOCKET = os.getenv('LEDGER_SOCKET', '')
 
 # Check if the token is available
 if not TOKEN:
     raise ValueError("No Discord token found. Please set the DISCORD_TOKEN environment variable.")
 
-if SHOP_CHANNEL_ID == 0:
-    print("Warning: SHOP_CHANNEL_ID not set properly. Please set this environment variable.")
-
-if not COMMAND_CHANNELS:
-    print("Warning: COMMAND_CHANNELS not set properly. Please set this environment variable.")
-
-if POINTS_CHANNEL_ID == 0:
-    print("Warning: POINTS_CHANNEL_ID not set properly. Please set this environment variable.")
-
 intents = discord.Intents.default()
 intents.messages = True
 intents.message_content = True
 intents.guilds = True
 intents.members = True
 
-bot = commands.Bot(command_prefix='!', intents=intents)
-bot.shop_channel_id = SHOP_CHANNEL_ID  # Store as attribute for extensions to use
-bot.command_channels = COMMAND_CHANNELS  # Store command channels
-bot.points_channel_id = POINTS_CHANNEL_ID  # Store points channel
+if SHARD_COUNT:
+    shard_count = None if SHARD_COUNT == 'auto' else int(SHARD_COUNT)
+    if shard_count is None and SHARD_IDS:
+        # discord.py only picks the count itself when it runs every shard, with a subset it must be known
+        try:
+            shard_count = recommended_shards(TOKEN)
+        except OSError as e:
+            raise ValueError(f"SHARD_COUNT=auto with SHARD_IDS needs Discord's recommended shard count, which couldn't be fetched ({e}). Set SHARD_COUNT to a number.") from e
+        log.info("Using Discord's recommended shard count", shard_count=shard_count, shard_ids=SHARD_IDS)
+    if shard_count is not None and any(shard_id >= shard_count for shard_id in SHARD_IDS):
+        raise ValueError(f"SHARD_IDS {SHARD_IDS} must all be below SHARD_COUNT ({shard_count})")
+    bot = commands.AutoShardedBot(
+        command_prefix='!', intents=intents,
+        shard_count=shard_count,
+        shard_ids=SHARD_IDS or None
+    )
+else:
+    bot = commands.Bot(command_prefix='!', intents=intents)
 
 # Get database path - use environment variable in Docker or default path
 DB_PATH = os.getenv('DB_PATH', 'shop.db')
-print(f"Using database path: {DB_PATH}")
+log.info("Using database", path=DB_PATH)
 
 # Ensure data directory exists if using Docker path
 if os.path.dirname(DB_PATH) and not os.path.exists(os.path.dirname(DB_PATH)):
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    print(f"Created directory: {os.path.dirname(DB_PATH)}")
+    log.info("Created directory", path=os.path.dirname(DB_PATH))
 
-# Initialize database with retry logic
-def init_database(max_retries=5, retry_delay=2):
-    """Initialize the database with retry logic for cloud deployments"""
-    retries = 0
-    last_error = None
-    
-    while retries < max_retries:
-        try:
-            # Set up database
-            conn = sqlite3.connect(DB_PATH)
-            c = conn.cursor()
-            
-            # Create tables
-            c.execute('''CREATE TABLE IF NOT EXISTS users (user_id INTEGER PRIMARY KEY, balance INTEGER)''')
-            c.execute('''CREATE TABLE IF NOT EXISTS shop_items (
-                        id INTEGER PRIMARY KEY,
-                        name TEXT,
-                        price INTEGER,
-                        role_id INTEGER)''')
-            c.execute('''CREATE TABLE IF NOT EXISTS admin_roles (role_id INTEGER PRIMARY KEY)''')
-            c.execute('''CREATE TABLE IF NOT EXISTS daily_rewards 
-                        (user_id INTEGER PRIMARY KEY, 
-                        last_claim TIMESTAMP,
-                        streak INTEGER DEFAULT 0)''')
-            conn.commit()
-            
-            # Add sample shop items if table is empty
-            c.execute("SELECT COUNT(*) FROM shop_items")
-            if c.fetchone()[0] == 0:
-                sample_items = [
-                    ("🪼Furina", 50000, 1361011749913890816),
-                    ("🌟Navia", 50000, 1361012791791845477), 
-                    ("🌸Raiden Shogun", 50000, 1361013400758386868),
-                    ("☠One Piece", 50000, 1361014183927349468),
-                    ("🦊Naruto", 50000, 1361014693459656805),
-                    ("愛Bleach", 50000, 1361014463943147721),
-                    ("💎VIP", 100000, 1361014938155483298)
-                ]
-                c.executemany("INSERT INTO shop_items (name, price, role_id) VALUES (?, ?, ?)", sample_items)
-                conn.commit()
-                print("Initialized shop items.")
-            
-            print("Database initialization successful.")
-            return conn
-            
-        except sqlite3.Error as e:
-            last_error = e
-            retries += 1
-            print(f"Database initialization error (attempt {retries}/{max_retries}): {e}")
-            
-            # Check if directory is writable
-            if os.path.dirname(DB_PATH):
-                try:
-                    test_file = os.path.join(os.path.dirname(DB_PATH), 'test_write.txt')
-                    with open(test_file, 'w') as f:
-                        f.write('test')
-                    os.remove(test_file)
-                    print(f"Directory {os.path.dirname(DB_PATH)} is writable.")
-                except Exception as e:
-                    print(f"Directory write test failed: {e}")
-            
-            if retries < max_retries:
-                print(f"Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-                retry_delay *= 1.5  # Exponential backoff
-    
-    # If we get here, all retries failed
-    raise last_error or sqlite3.Error("Failed to initialize database after multiple attempts")
-
-# Initialize database connection
-conn = init_database()
-c = conn.cursor()
-
-# Define a simple HTTP handler for health checks
-class HealthHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == '/health' or self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/plain')
-            self.end_headers()
-            self.wfile.write(b'Bot is running')
-        else:
-            self.send_response(404)
-            self.send_header('Content-type', 'text/plain')
-            self.end_headers()
-            self.wfile.write(b'Not Found')
-    
-    def log_message(self, format, *args):
-        # Suppress log messages to avoid cluttering console
-        return
+if LEDGER_SOCKET:
+    # Reads stay in this process, writes and balances are served by the ledger process (which migrates)
+    ledger_client = LedgerClient(LEDGER_SOCKET)
+    db = RemoteDatabase(ledger_client, DatabaseConfig())
+else:
+    # Open the shared data-access layer (WAL + tuned pragmas) and apply pending schema migrations
+    ledger_client = None
+    db = Database(DatabaseConfig())
+    applied = db.call(migrate, db.conn)
+    log.info("Database schema up to date", applied=len(applied))
+bot.db = db  # Store as attribute for extensions to use
+
+# Every guild's channels and admin roles, read on each message without touching the database
+bot.guild_configs = GuildConfigStore(db)
+bot.guild_configs.load_sync()
+
+# All balance reads and writes go through the ledger, which coalesces message
+# earnings in memory and keeps hot balances in a write-through LRU cache
+ledger = RemoteLedger(ledger_client) if ledger_client else create_ledger(db)
+bot.ledger = ledger  # Store as attribute for extensions to use
+
+# Shop items are served from memory, cogs call bot.catalog.invalidate(guild_id) after editing them
+bot.catalog = ShopCatalog(db)
+
+# Resolve users from the gateway caches before falling back to REST fetches
+bot.user_resolver = UserResolver(bot, cache_size=int(os.getenv('USER_CACHE_SIZE', '5000')))
 
-# Start HTTP server for health checks
-def start_http_server():
-    port = int(os.getenv('PORT', 8000))
-    server = HTTPServer(('0.0.0.0', port), HealthHandler)
-    print(f"Starting health check server on port {port}")
-    server.serve_forever()
+# Gauges read at scrape time, so they cost nothing between scrapes
+metrics.registry.gauge(
+    "bitbuddy_ledger", "Balance cache and accrual buffer counters", ("stat",),
+    callback=lambda: {(name,): value for name, value in ledger.stats().items()}
+)
+metrics.registry.gauge("bitbuddy_gateway_latency_seconds", "Discord gateway heartbeat latency", callback=lambda: bot.latency)
+metrics.registry.gauge("bitbuddy_guilds", "Guilds the bot is in", callback=lambda: len(bot.guilds))
+
+# Time every outbound Discord REST call
+metrics.instrument_http(bot.http)
+
+@tasks.loop(seconds=1)
+async def flush_accruals():
+    """Flush pending message earnings once the age threshold is reached"""
+    if ledger.flush_due():
+        await ledger.flush()
+
+EXTENSIONS = ["utils.admin_tools", "utils.daily_rewards", "utils.shop_system", "utils.leaderboard"]
+
+@bot.event
+async def setup_hook():
+    if ledger_client:
+        await ledger_client.start()
+    # Health, readiness and metrics endpoints run on the bot's own loop
+    bot.health_server = HealthServer(bot, EXTENSIONS)
+    await bot.health_server.start()
+    flush_accruals.start()
+    # Warm the shop catalogs so the first !shop in each guild doesn't hit the database
+    for guild_id in bot.guild_configs.configs:
+        await bot.catalog.get(guild_id)
 
 @bot.event
 async def on_ready():
-    print(f"Logged in as {bot.user.name} ({bot.user.id})")
-    print(f"Ready to serve {len(bot.guilds)} guilds")
-    print(f"Using database: {DB_PATH}")
-    print(f"Command channels: {COMMAND_CHANNELS}")
-    print(f"Points channel: {POINTS_CHANNEL_ID}")
-    print("------")
+    log.info(
+        "Logged in", user=bot.user.name, user_id=bot.user.id, guilds=len(bot.guilds),
+        database=DB_PATH, configured_guilds=len(bot.guild_configs.configs)
+    )
+    
+    await claim_legacy_data()
     
     # Load extensions
     await load_extensions()
     
-    print("\nPermission system:")
-    print("- Regular users can use: !balance, !shop, !daily")
-    print("- Admin users (with specific roles) can use: !admin commands")
-    print("- To add admin roles, use: !admin addrole @role")
-    print("- To view current admin roles, use: !admin listroles")
-    print("------")
+    log.info(
+        "Permission system: regular users can use !balance, !shop, !daily, !leaderboard and !rank; "
+        "admin users (with specific roles) can use !admin commands. "
+        "Add admin roles with !admin addrole @role, view them with !admin listroles"
+    )
+
+async def claim_legacy_data():
+    """Give data from before guild scoping (stored under guild 0) to the guild it came from"""
+    if not bot.guild_configs.legacy_pending:
+        return
+    if SHARD_IDS:
+        # This process only sees its shards' guilds, the one running LEGACY_GUILD_ID's shard claims
+        if LEGACY_GUILD_ID and bot.get_guild(LEGACY_GUILD_ID) is None:
+            return
+        guild_id = LEGACY_GUILD_ID
+    else:
+        guild_id = LEGACY_GUILD_ID or (bot.guilds[0].id if len(bot.guilds) == 1 else 0)
+    if not guild_id:
+        log.warning(
+            "Data from before guild scoping is unclaimed, set LEGACY_GUILD_ID to the guild it belongs to",
+            guilds=len(bot.guilds)
+        )
+        return
+    defaults = GuildConfig(guild_id, SHOP_CHANNEL_ID, POINTS_CHANNEL_ID, COMMAND_CHANNELS)
+    await bot.guild_configs.claim_legacy(guild_id, defaults)
+    bot.catalog.invalidate(guild_id)
 
 async def load_extensions():
     """Load all cog extensions"""
     # Load extensions asynchronously
-    for ext in ["utils.admin_tools", "utils.daily_rewards", "utils.shop_system"]:
+    for ext in EXTENSIONS:
         try:
             await bot.load_extension(ext)
-            print(f"Loaded extension: {ext}")
-        except Exception as e:
-            print(f"Failed to load extension {ext}: {e}")
-            traceback.print_exc()  # Add this line to see full error details
+            log.info("Loaded extension", extension=ext)
+        except Exception:
+            log.exception("Failed to load extension", extension=ext)
+
+@bot.before_invoke
+async def start_command_timer(ctx):
+    # Groups (!admin) run the hooks for themselves and again for the subcommand, keep the first start
+    if not hasattr(ctx, "started_at"):
+        ctx.started_at = time.perf_counter()
+
+@bot.after_invoke
+async def record_command_latency(ctx):
+    # Runs after every invoked command, including ones that raised
+    if isinstance(ctx.command, commands.Group) and ctx.invoked_subcommand is not None:
+        return  # The subcommand's own after hook records the whole invocation under its name
+    started_at = getattr(ctx, "started_at", None)
+    if started_at is not None:
+        status = "error" if ctx.command_failed else "ok"
+        metrics.command_seconds.observe(time.perf_counter() - started_at, ctx.command.qualified_name, status)
 
 # XP + currency system (basic message earning)
 @bot.event
 async def on_message(message):
     if message.author.bot:
+        metrics.messages_total.inc("bot")
+        return
+    if message.guild is None:
+        metrics.messages_total.inc("other")  # Economies are per guild, DMs earn nothing
         return
 
-    # Only accumulate points in the designated points channel
-    if message.channel.id == POINTS_CHANNEL_ID:
-        user_id = message.author.id
-        c.execute("SELECT balance FROM users WHERE user_id = ?", (user_id,))
-        result = c.fetchone()
+    with metrics.message_handler_seconds.time():
+        config = bot.guild_configs.get(message.guild.id)
 
-        if result:
-            new_balance = result[0] + random.randint(10, 50)
-            c.execute("UPDATE users SET balance = ? WHERE user_id = ?", (new_balance, user_id))
+        # Only accumulate points in the guild's points channel
+        if message.channel.id == config.points_channel_id:
+            metrics.messages_total.inc("accrued")
+            # Buffered, written to the database in batches by flush_accruals
+            if ledger.accrue(message.guild.id, message.author.id, random.randint(10, 50)):
+                await ledger.flush()
         else:
-            new_balance = random.randint(10, 50)
-            c.execute("INSERT INTO users (user_id, balance) VALUES (?, ?)", (user_id, new_balance))
-
-        conn.commit()
+            metrics.messages_total.inc("other")
 
-    # Process commands only in allowed channels
-    if message.channel.id in COMMAND_CHANNELS:
-        await bot.process_commands(message)
+        # Process commands only in allowed channels (anywhere until the guild sets some, so admins can)
+        if config.allows_commands(message.channel.id):
+            await bot.process_commands(message)
 
 # Show user balance with embed
 @bot.command()
 async def balance(ctx):
-    # Debug logging
-    print(f"Balance command called in channel {ctx.channel.id}")
-    print(f"Command channels: {COMMAND_CHANNELS}")
+    log.debug("Balance command called", channel_id=ctx.channel.id, user_id=ctx.author.id)
     
     # Check if command is used in an allowed channel
-    if ctx.channel.id not in COMMAND_CHANNELS:
-        print(f"Balance command rejected - channel {ctx.channel.id} not in allowed channels")
+    if not bot.guild_configs.get(ctx.guild.id).allows_commands(ctx.channel.id):
+        log.debug("Balance command rejected, channel not allowed", channel_id=ctx.channel.id)
         return await ctx.send("❌ This command can only be used in designated command channels.")
     
-    from utils.embeds import create_balance_embed
-    
-    user_id = ctx.author.id
-    c.execute("SELECT balance FROM users WHERE user_id = ?", (user_id,))
-    result = c.fetchone()
-    
-    if result:
-        embed = create_balance_embed(ctx.author, result[0])
-    else:
-        embed = create_balance_embed(ctx.author, 0)
-        
+    # Served from the balance cache for active users, includes unflushed earnings
+    embed = create_balance_embed(ctx.author, await ledger.get_balance(ctx.guild.id, ctx.author.id))
     await ctx.send(embed=embed)
 
 # Cleanly close the database connection on exit
 def cleanup():
-    if conn:
-        conn.close()
-        print("Database connection closed.")
+    if db:
+        flushed = ledger.flush_sync()
+        log.info("Flushed pending balances", users=flushed)
+        db.close()
+        log.info("Database connection closed")
 
 # Start the bot
 if __name__ == "__main__":
-    # Start HTTP server in a separate thread for health checks
-    http_thread = threading.Thread(target=start_http_server, daemon=True)
-    http_thread.start()
-    
     try:
-        bot.run(TOKEN)
+        # log_handler=None: discord.py logs through our queue handler instead of its own
+        bot.run(TOKEN, log_handler=None)
     finally:
         # Ensure we clean up resources
         cleanup()
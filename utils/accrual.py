@@ -0,0 +1,59 @@
+import time
+
+class AccrualBuffer:
+    """Write-behind buffer that coalesces per-account balance increments
+
+    The buffer only holds the coins, utils.ledger.Ledger decides when to flush
+    them and writes each batch as one upsert transaction. Accounts are
+    (guild_id, user_id) pairs.
+    """
+
+    def __init__(self, max_pending=500, max_age=5.0):
+        self.max_pending = max_pending  # Flush once this many accounts have pending coins
+        self.max_age = max_age  # Flush once the oldest pending increment is this old (seconds)
+        self.pending = {}  # {(guild_id, user_id): coins not yet written}
+        self.first_pending_at = None
+
+        # Simple counters so we can see how well writes are being coalesced
+        self.total_increments = 0
+        self.total_flushes = 0
+        self.total_rows_written = 0
+
+    def add(self, account, amount):
+        """Queue coins for an account, returns True if a flush is due"""
+        if not self.pending:
+            self.first_pending_at = time.monotonic()
+        self.pending[account] = self.pending.get(account, 0) + amount
+        self.total_increments += 1
+        return self.should_flush()
+
+    def pending_for(self, account):
+        """Coins queued for an account that have not been submitted for writing yet"""
+        return self.pending.get(account, 0)
+
+    def should_flush(self):
+        """Check whether the size or age threshold has been reached"""
+        if not self.pending:
+            return False
+        if len(self.pending) >= self.max_pending:
+            return True
+        return time.monotonic() - self.first_pending_at >= self.max_age
+
+    def take_batch(self):
+        """Swap out the pending increments so new ones start a fresh batch"""
+        batch = list(self.pending.items())
+        self.pending = {}
+        self.first_pending_at = None
+        return batch
+
+    def restore_batch(self, batch):
+        """Put the coins from a failed flush back so the next flush retries them"""
+        for account, amount in batch:
+            self.pending[account] = self.pending.get(account, 0) + amount
+        if self.first_pending_at is None:
+            self.first_pending_at = time.monotonic()
+
+    def record_flush(self, rows):
+        """Update the counters after a batch has been written"""
+        self.total_flushes += 1
+        self.total_rows_written += rows
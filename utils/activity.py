@@ -0,0 +1,84 @@
+import time
+
+class ActivityRecord:
+    """Per-user activity as a bitmask of minute buckets
+
+    Bit 0 is the minute the user was last seen, bit n is n minutes before that.
+    """
+    __slots__ = ("last_minute", "mask")
+
+    def __init__(self, minute):
+        self.last_minute = minute
+        self.mask = 1
+
+class ActivityTracker:
+    """Counts distinct active minutes per user over a sliding window
+
+    Each tracked user costs one small record with a window-sized integer, and
+    users idle for longer than the window are dropped by expire().
+    """
+
+    def __init__(self, window_minutes=120):
+        self.window_minutes = window_minutes
+        self.full_mask = (1 << window_minutes) - 1
+        self.records = {}  # {user_id: ActivityRecord}
+
+    def __len__(self):
+        return len(self.records)
+
+    @staticmethod
+    def current_minute(now=None):
+        return int((time.time() if now is None else now) // 60)
+
+    def record(self, user_id, now=None):
+        """Mark the user as active in the current minute"""
+        minute = self.current_minute(now)
+        record = self.records.get(user_id)
+        if record is None:
+            self.records[user_id] = ActivityRecord(minute)
+            return
+
+        shift = minute - record.last_minute
+        if shift <= 0:
+            record.mask |= 1  # Same minute (or clock went backwards), nothing new to count
+        elif shift >= self.window_minutes:
+            record.mask = 1
+            record.last_minute = minute
+        else:
+            record.mask = ((record.mask << shift) | 1) & self.full_mask
+            record.last_minute = minute
+
+    def _window_mask(self, record, minute):
+        """The record's mask aligned to the given minute, with expired buckets dropped"""
+        age = minute - record.last_minute
+        if age >= self.window_minutes:
+            return 0
+        if age <= 0:
+            return record.mask
+        return (record.mask << age) & self.full_mask
+
+    def active_minutes(self, user_id, now=None):
+        """Number of distinct minutes the user was active within the window"""
+        record = self.records.get(user_id)
+        if record is None:
+            return 0
+        return bin(self._window_mask(record, self.current_minute(now))).count("1")
+
+    def pop_eligible(self, min_minutes, now=None):
+        """Remove and return every user with at least min_minutes active minutes"""
+        minute = self.current_minute(now)
+        eligible = [
+            user_id for user_id, record in self.records.items()
+            if bin(self._window_mask(record, minute)).count("1") >= min_minutes
+        ]
+        for user_id in eligible:
+            del self.records[user_id]
+        return eligible
+
+    def expire(self, now=None):
+        """Forget users with no activity inside the window, returns how many were dropped"""
+        cutoff = self.current_minute(now) - self.window_minutes
+        idle = [user_id for user_id, record in self.records.items() if record.last_minute <= cutoff]
+        for user_id in idle:
+            del self.records[user_id]
+        return len(idle)
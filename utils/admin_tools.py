@@ -1,73 +1,36 @@
 import discord
 from discord.ext import commands
+import asyncio
 import sqlite3
 import datetime
+import io
 import os
-import time
+from utils.catalog import MAX_CATEGORY_LENGTH
+from utils.profiler import profile
+from utils.log import get_logger
+
+log = get_logger(__name__)
 
 class AdminTools(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.conn = self.connect_with_retry()
-        self.c = self.conn.cursor()
-        
-        # Create admin_roles table if it doesn't exist
-        self.c.execute('''CREATE TABLE IF NOT EXISTS admin_roles 
-                       (role_id INTEGER PRIMARY KEY)''')
-        self.conn.commit()
-        
-        # Load admin roles from database
-        self.admin_role_ids = self.load_admin_roles()
-        
-    def connect_with_retry(self, max_retries=5, retry_delay=1):
-        """Connect to the database with retry logic"""
-        DB_PATH = os.getenv('DB_PATH', 'shop.db')
-        retries = 0
-        last_error = None
-        
-        while retries < max_retries:
-            try:
-                conn = sqlite3.connect(DB_PATH)
-                print(f"AdminTools: Successfully connected to database at {DB_PATH}")
-                return conn
-            except sqlite3.Error as e:
-                last_error = e
-                retries += 1
-                print(f"AdminTools: Database connection error (attempt {retries}/{max_retries}): {e}")
-                if retries < max_retries:
-                    time.sleep(retry_delay)
-                    retry_delay *= 1.5  # Exponential backoff
-        
-        # If we get here, all retries failed
-        raise last_error or sqlite3.Error("AdminTools: Failed to connect to database after multiple attempts")
-        
-    def load_admin_roles(self):
-        """Load admin roles from database"""
-        try:
-            self.c.execute("SELECT role_id FROM admin_roles")
-            return [role_id[0] for role_id in self.c.fetchall()]
-        except sqlite3.Error as e:
-            print(f"AdminTools: Error loading admin roles: {e}")
-            return []
+        self.db = bot.db
+        self.guild_configs = bot.guild_configs  # Admin roles and channels, per guild
+        self.profiling = False  # Only one profiling window at a time
         
-    def save_admin_role(self, role_id):
+    async def save_admin_role(self, guild_id, role_id):
         """Save a role ID to the database"""
         try:
-            self.c.execute("INSERT OR IGNORE INTO admin_roles (role_id) VALUES (?)", (role_id,))
-            self.conn.commit()
+            await self.guild_configs.add_admin_role(guild_id, role_id)
         except sqlite3.Error as e:
-            print(f"AdminTools: Error saving admin role: {e}")
+            log.error("Error saving admin role", guild_id=guild_id, role_id=role_id, error=e)
         
-    def remove_admin_role(self, role_id):
+    async def remove_admin_role(self, guild_id, role_id):
         """Remove a role ID from the database"""
         try:
-            self.c.execute("DELETE FROM admin_roles WHERE role_id = ?", (role_id,))
-            self.conn.commit()
+            await self.guild_configs.remove_admin_role(guild_id, role_id)
         except sqlite3.Error as e:
-            print(f"AdminTools: Error removing admin role: {e}")
-        
-    def cog_unload(self):
-        self.conn.close()
+            log.error("Error removing admin role", guild_id=guild_id, role_id=role_id, error=e)
         
     async def cog_check(self, ctx):
         """Only allow users with specific roles to use these commands"""
@@ -75,9 +38,10 @@ class AdminTools(commands.Cog):
         if ctx.author.guild_permissions.administrator:
             return True
             
-        # Check if the user has any of the allowed roles
+        # Check if the user has any of the guild's admin roles
+        admin_role_ids = self.guild_configs.get(ctx.guild.id).admin_role_ids
         for role in ctx.author.roles:
-            if role.id in self.admin_role_ids:
+            if role.id in admin_role_ids:
                 return True
                 
         # If we get here, the user doesn't have permission
@@ -103,11 +67,20 @@ class AdminTools(commands.Cog):
                 "`!admin viewbalance @user` - View another user's balance"
             ), inline=False)
             embed.add_field(name="Shop Management", value=(
-                "`!admin additem name price role_id` - Add an item to the shop\n"
+                "`!admin additem name price role_id [category]` - Add an item to the shop\n"
+                "`!admin setcategory name [category]` - Move an item to a shop category\n"
                 "`!admin removeitem name` - Remove an item from the shop\n"
                 "`!admin updateprice name price` - Update an item's price\n"
                 "`!admin listitems` - List all shop items"
             ), inline=False)
+            embed.add_field(name="Server Setup", value=(
+                "`!admin setchannel shop|points #channel` - Set the shop or points channel\n"
+                "`!admin postshop` - Refresh the shop message (reposts it if deleted)\n"
+                "`!admin synccommands` - Register slash commands (like /updateprice) in this server\n"
+                "`!admin addcommandchannel #channel` - Allow commands in a channel\n"
+                "`!admin removecommandchannel #channel` - Stop allowing commands in a channel\n"
+                "`!admin config` - Show this server's channels and admin roles"
+            ), inline=False)
             embed.add_field(name="Role Management", value=(
                 "`!admin addrole @role` - Add a role that can use admin commands\n"
                 "`!admin removerole @role` - Remove a role from admin access\n"
@@ -117,7 +90,10 @@ class AdminTools(commands.Cog):
                 "`!admin resetdaily @user` - Reset a user's daily reward"
             ), inline=False)
             embed.add_field(name="Database Management", value=(
-                "`!admin updateprices` - Update all shop prices to new values"
+                "`!admin updateprices [preview]` - Reprice the shop from the pricing rules file"
+            ), inline=False)
+            embed.add_field(name="Diagnostics", value=(
+                "`!admin profile seconds` - Profile CPU and memory for a few seconds"
             ), inline=False)
             await ctx.send(embed=embed)
         
@@ -126,15 +102,14 @@ class AdminTools(commands.Cog):
     @commands.has_permissions(administrator=True)  # Only server admins can add admin roles
     async def add_admin_role(self, ctx, role: discord.Role):
         """Add a role to the list of admin roles"""
-        if role.id in self.admin_role_ids:
+        if role.id in self.guild_configs.get(ctx.guild.id).admin_role_ids:
             embed = discord.Embed(
                 title="❌ Error",
                 description=f"{role.mention} is already an admin role",
                 color=discord.Color.red()
             )
         else:
-            self.admin_role_ids.append(role.id)
-            self.save_admin_role(role.id)
+            await self.save_admin_role(ctx.guild.id, role.id)
             embed = discord.Embed(
                 title="✅ Role Added",
                 description=f"{role.mention} can now use admin commands",
@@ -148,9 +123,8 @@ class AdminTools(commands.Cog):
     @commands.has_permissions(administrator=True)  # Only server admins can remove admin roles
     async def remove_admin_role_cmd(self, ctx, role: discord.Role):
         """Remove a role from the list of admin roles"""
-        if role.id in self.admin_role_ids:
-            self.admin_role_ids.remove(role.id)
-            self.remove_admin_role(role.id)
+        if role.id in self.guild_configs.get(ctx.guild.id).admin_role_ids:
+            await self.remove_admin_role(ctx.guild.id, role.id)
             embed = discord.Embed(
                 title="✅ Role Removed",
                 description=f"{role.mention} can no longer use admin commands",
@@ -176,7 +150,7 @@ class AdminTools(commands.Cog):
         )
         
         roles_found = False
-        for role_id in self.admin_role_ids:
+        for role_id in self.guild_configs.get(ctx.guild.id).admin_role_ids:
             role = ctx.guild.get_role(role_id)
             if role:
                 embed.add_field(name=role.name, value=f"ID: {role.id}", inline=False)
@@ -190,6 +164,100 @@ class AdminTools(commands.Cog):
         
         await ctx.send(embed=embed)
         
+    @admin.command(name="setchannel")
+    @commands.has_permissions(administrator=True)
+    async def set_channel(self, ctx, kind: str, channel: discord.TextChannel):
+        """Set this server's shop or points channel"""
+        kind = kind.lower()
+        if kind not in ("shop", "points"):
+            return await ctx.send("❌ Channel type must be `shop` or `points`.")
+            
+        await self.guild_configs.set_channel(ctx.guild.id, kind, channel.id)
+        embed = discord.Embed(
+            title="✅ Channel Set",
+            description=f"{channel.mention} is now the {kind} channel",
+            color=discord.Color.green()
+        )
+        await ctx.send(embed=embed)
+        if kind == "shop":
+            await self.post_shop(ctx.guild.id)
+        
+    async def post_shop(self, guild_id):
+        """Edit (or post) the guild's persistent shop message now (owned by ShopSystem)"""
+        shop = self.bot.get_cog("ShopSystem")
+        if shop is not None:
+            await shop.refresh_shop_message(guild_id)
+        
+    async def catalog_changed(self, guild_id):
+        """Reload the guild's catalog and schedule a shop message refresh (debounced)"""
+        self.bot.catalog.invalidate(guild_id)
+        shop = self.bot.get_cog("ShopSystem")
+        if shop is not None:
+            await shop.update_shop_ui(guild_id)
+        
+    @admin.command(name="synccommands")
+    async def sync_commands(self, ctx):
+        """Register the bot's slash commands in this server (they show up right away)"""
+        self.bot.tree.copy_global_to(guild=ctx.guild)
+        synced = await self.bot.tree.sync(guild=ctx.guild)
+        await ctx.send(f"✅ Synced {len(synced)} slash command(s) to this server.")
+        
+    @admin.command(name="postshop")
+    async def post_shop_cmd(self, ctx):
+        """Refresh the shop message, posting it again if it was deleted"""
+        if not self.guild_configs.get(ctx.guild.id).shop_channel_id:
+            return await ctx.send("❌ Set a shop channel first with `!admin setchannel shop #channel`.")
+        await self.post_shop(ctx.guild.id)
+        await ctx.send("✅ Shop message refreshed.")
+        
+    @admin.command(name="addcommandchannel")
+    @commands.has_permissions(administrator=True)
+    async def add_command_channel(self, ctx, channel: discord.TextChannel):
+        """Allow bot commands in a channel"""
+        await self.guild_configs.add_command_channel(ctx.guild.id, channel.id)
+        embed = discord.Embed(
+            title="✅ Command Channel Added",
+            description=f"Commands can now be used in {channel.mention}",
+            color=discord.Color.green()
+        )
+        await ctx.send(embed=embed)
+        
+    @admin.command(name="removecommandchannel")
+    @commands.has_permissions(administrator=True)
+    async def remove_command_channel(self, ctx, channel: discord.TextChannel):
+        """Stop allowing bot commands in a channel"""
+        await self.guild_configs.remove_command_channel(ctx.guild.id, channel.id)
+        embed = discord.Embed(
+            title="✅ Command Channel Removed",
+            description=f"Commands can no longer be used in {channel.mention}",
+            color=discord.Color.orange()
+        )
+        await ctx.send(embed=embed)
+        
+    @admin.command(name="config")
+    async def show_config(self, ctx):
+        """Show this server's channels and admin roles"""
+        config = self.guild_configs.get(ctx.guild.id)
+        
+        def mention(channel_id):
+            return f"<#{channel_id}>" if channel_id else "Not set"
+        
+        embed = discord.Embed(title="⚙️ Server Config", color=discord.Color.blue())
+        embed.add_field(name="Shop Channel", value=mention(config.shop_channel_id))
+        embed.add_field(name="Points Channel", value=mention(config.points_channel_id))
+        embed.add_field(
+            name="Command Channels",
+            value=", ".join(mention(channel_id) for channel_id in sorted(config.command_channels))
+            or "Not set (commands work in every channel)",
+            inline=False
+        )
+        embed.add_field(
+            name="Admin Roles",
+            value=", ".join(f"<@&{role_id}>" for role_id in sorted(config.admin_role_ids)) or "Server administrators only",
+            inline=False
+        )
+        await ctx.send(embed=embed)
+        
     @admin.command(name="addcoins")
     async def add_coins(self, ctx, user: discord.Member, amount: int):
         """Add coins to a user's balance"""
@@ -201,17 +269,7 @@ class AdminTools(commands.Cog):
             )
             return await ctx.send(embed=embed)
             
-        self.c.execute("SELECT balance FROM users WHERE user_id = ?", (user.id,))
-        result = self.c.fetchone()
-        
-        if result:
-            new_balance = result[0] + amount
-            self.c.execute("UPDATE users SET balance = ? WHERE user_id = ?", (new_balance, user.id))
-        else:
-            new_balance = amount
-            self.c.execute("INSERT INTO users (user_id, balance) VALUES (?, ?)", (user.id, amount))
-            
-        self.conn.commit()
+        new_balance = await self.bot.ledger.credit(ctx.guild.id, user.id, amount)
         
         embed = discord.Embed(
             title="💰 Coins Added",
@@ -235,20 +293,15 @@ class AdminTools(commands.Cog):
             )
             return await ctx.send(embed=embed)
             
-        self.c.execute("SELECT balance FROM users WHERE user_id = ?", (user.id,))
-        result = self.c.fetchone()
+        new_balance = await self.bot.ledger.debit_floor(ctx.guild.id, user.id, amount)
         
-        if not result:
+        if new_balance is None:
             embed = discord.Embed(
                 title="❌ Error",
                 description=f"{user.mention} doesn't have any coins",
                 color=discord.Color.red()
             )
             return await ctx.send(embed=embed)
-            
-        new_balance = max(0, result[0] - amount)
-        self.c.execute("UPDATE users SET balance = ? WHERE user_id = ?", (new_balance, user.id))
-        self.conn.commit()
         
         embed = discord.Embed(
             title="💰 Coins Removed",
@@ -272,15 +325,7 @@ class AdminTools(commands.Cog):
             )
             return await ctx.send(embed=embed)
             
-        self.c.execute("SELECT balance FROM users WHERE user_id = ?", (user.id,))
-        result = self.c.fetchone()
-        
-        if result:
-            self.c.execute("UPDATE users SET balance = ? WHERE user_id = ?", (amount, user.id))
-        else:
-            self.c.execute("INSERT INTO users (user_id, balance) VALUES (?, ?)", (user.id, amount))
-            
-        self.conn.commit()
+        await self.bot.ledger.set_balance(ctx.guild.id, user.id, amount)
         
         embed = discord.Embed(
             title="💰 Balance Set",
@@ -295,13 +340,7 @@ class AdminTools(commands.Cog):
     @admin.command(name="viewbalance")
     async def view_balance(self, ctx, user: discord.Member):
         """View a user's coin balance"""
-        self.c.execute("SELECT balance FROM users WHERE user_id = ?", (user.id,))
-        result = self.c.fetchone()
-        
-        if result:
-            balance = result[0]
-        else:
-            balance = 0
+        balance = await self.bot.ledger.get_balance(ctx.guild.id, user.id)
             
         embed = discord.Embed(
             title="💰 User Balance",
@@ -317,8 +356,7 @@ class AdminTools(commands.Cog):
     @admin.command(name="resetdaily")
     async def reset_daily(self, ctx, user: discord.Member):
         """Reset a user's daily reward streak and timestamp"""
-        self.c.execute("DELETE FROM daily_rewards WHERE user_id = ?", (user.id,))
-        self.conn.commit()
+        await self.db.execute("DELETE FROM daily_rewards WHERE guild_id = ? AND user_id = ?", (ctx.guild.id, user.id))
         
         embed = discord.Embed(
             title="🔄 Daily Reset",
@@ -331,12 +369,14 @@ class AdminTools(commands.Cog):
         await ctx.send(embed=embed)
         
     @admin.command(name="additem")
-    async def add_item(self, ctx, name: str, price: int, role_id: int):
+    async def add_item(self, ctx, name: str, price: int, role_id: int, *, category: str = ""):
         """Add an item to the shop"""
+        if len(category.strip()) > MAX_CATEGORY_LENGTH:
+            return await ctx.send(f"❌ Category names can be at most {MAX_CATEGORY_LENGTH} characters.")
         # Actually connect to the shop database
-        self.c.execute("INSERT INTO shop_items (name, price, role_id) VALUES (?, ?, ?)", 
-                      (name, price, role_id))
-        self.conn.commit()
+        await self.db.execute("INSERT INTO shop_items (guild_id, name, price, role_id, category) VALUES (?, ?, ?, ?, ?)", 
+                              (ctx.guild.id, name, price, role_id, category.strip()))
+        await self.catalog_changed(ctx.guild.id)
         
         embed = discord.Embed(
             title="🛒 Item Added",
@@ -344,29 +384,67 @@ class AdminTools(commands.Cog):
             color=discord.Color.green()
         )
         embed.add_field(name="Role ID", value=str(role_id))
+        if category.strip():
+            embed.add_field(name="Category", value=category.strip())
+        embed.set_footer(text=f"Admin: {ctx.author.name}")
+        embed.timestamp = datetime.datetime.now()
+        
+        await ctx.send(embed=embed)
+        
+    async def find_item(self, ctx, name, exact=False):
+        """Resolve an item name against the guild's catalog, replying with why if it isn't one item
+
+        exact=True only accepts the item's full name (case and emoji aside) or #id.
+        """
+        catalog = await self.bot.catalog.get(ctx.guild.id)
+        lookup = catalog.index.resolve(name, exact=exact)
+        if lookup.problem:
+            await ctx.send(lookup.problem)
+        return lookup.item
+        
+    @admin.command(name="setcategory")
+    async def set_category(self, ctx, name: str, *, category: str = ""):
+        """Move an item to a shop category (no category moves it back to General)"""
+        if len(category.strip()) > MAX_CATEGORY_LENGTH:
+            return await ctx.send(f"❌ Category names can be at most {MAX_CATEGORY_LENGTH} characters.")
+        item = await self.find_item(ctx, name, exact=True)
+        if item is None:
+            return
+        rows_affected = await self.db.execute(
+            "UPDATE shop_items SET category = ? WHERE id = ? AND guild_id = ?", (category.strip(), item[0], ctx.guild.id)
+        )
+        if rows_affected == 0:
+            return await ctx.send(f"❌ Item **{item[1]}** not found in the shop.")
+        await self.catalog_changed(ctx.guild.id)
+        
+        embed = discord.Embed(
+            title="🗂️ Category Set",
+            description=f"**{item[1]}** is now in **{category.strip() or 'General'}**",
+            color=discord.Color.green()
+        )
         embed.set_footer(text=f"Admin: {ctx.author.name}")
         embed.timestamp = datetime.datetime.now()
         
         await ctx.send(embed=embed)
         
     @admin.command(name="removeitem")
-    async def remove_item(self, ctx, name: str):
+    async def remove_item(self, ctx, *, name: str):
         """Remove an item from the shop"""
-        # Actually connect to the shop database
-        self.c.execute("DELETE FROM shop_items WHERE name = ?", (name,))
-        rows_affected = self.c.rowcount
-        self.conn.commit()
-        
+        item = await self.find_item(ctx, name, exact=True)
+        if item is None:
+            return
+        rows_affected = await self.db.execute("DELETE FROM shop_items WHERE id = ? AND guild_id = ?", (item[0], ctx.guild.id))
         if rows_affected > 0:
+            await self.catalog_changed(ctx.guild.id)
             embed = discord.Embed(
                 title="🗑️ Item Removed",
-                description=f"Removed **{name}** from the shop",
+                description=f"Removed **{item[1]}** from the shop",
                 color=discord.Color.red()
             )
         else:
             embed = discord.Embed(
                 title="❌ Error",
-                description=f"Item **{name}** not found in the shop",
+                description=f"Item **{item[1]}** not found in the shop",
                 color=discord.Color.red()
             )
             
@@ -390,22 +468,19 @@ class AdminTools(commands.Cog):
             except ValueError:
                 return await ctx.send("❌ Price must be a number.")
                 
-            # Find the item by name
-            self.c.execute("SELECT id, name, price FROM shop_items WHERE name LIKE ?", (f"%{item_name}%",))
-            items = self.c.fetchall()
-            
-            if not items:
-                return await ctx.send(f"❌ No items found matching '{item_name}'.")
-                
-            if len(items) > 1:
-                # Multiple matches, list them
-                item_list = "\n".join([f"• {item[1]} ({item[2]:,} coins)" for item in items])
-                return await ctx.send(f"Multiple items found. Please be more specific:\n{item_list}")
+            # Find the item by name (emoji and case don't matter, several matches are listed)
+            item = await self.find_item(ctx, item_name)
+            if item is None:
+                return
                 
             # Update the price
-            item_id, full_name, old_price = items[0]
-            self.c.execute("UPDATE shop_items SET price = ? WHERE id = ?", (new_price, item_id))
-            self.conn.commit()
+            item_id, full_name, old_price = item[:3]
+            rows_affected = await self.db.execute(
+                "UPDATE shop_items SET price = ? WHERE id = ? AND guild_id = ?", (new_price, item_id, ctx.guild.id)
+            )
+            if rows_affected == 0:
+                return await ctx.send(f"❌ Item **{full_name}** not found in the shop.")
+            await self.catalog_changed(ctx.guild.id)
             
             embed = discord.Embed(
                 title="✅ Price Updated",
@@ -423,8 +498,9 @@ class AdminTools(commands.Cog):
     async def list_items(self, ctx):
         """List all items in the shop"""
         try:
-            self.c.execute("SELECT id, name, price, role_id FROM shop_items ORDER BY price")
-            items = self.c.fetchall()
+            items = await self.db.fetchall(
+                "SELECT id, name, price, role_id FROM shop_items WHERE guild_id = ? ORDER BY price", (ctx.guild.id,)
+            )
             
             if not items:
                 return await ctx.send("❌ There are no items in the shop.")
@@ -450,47 +526,124 @@ class AdminTools(commands.Cog):
             await ctx.send(f"❌ Error listing items: {e}")
             
     @admin.command(name="updateprices")
-    async def update_prices(self, ctx):
-        """Update all shop prices to new balanced values"""
+    async def update_prices(self, ctx, mode: str = ""):
+        """Reprice the shop from the pricing rules file ("preview" shows the diff without applying it)"""
+        from utils.update_prices import PRICES_FILE, apply_new_prices, load_price_rules
+        
+        dry_run = mode.lower() == "preview"
+        message = await ctx.send("⏳ Comparing pricing rules with the shop...")
         try:
-            # Import the update_prices function
-            from utils.update_prices import update_shop_prices
-            
-            # Show processing message
-            message = await ctx.send("⏳ Updating shop prices...")
-            
-            # Run the update function
-            result = update_shop_prices()
-            
-            if result:
-                embed = discord.Embed(
-                    title="✅ Shop Prices Updated",
-                    description="All shop prices have been updated to new balanced values.",
-                    color=discord.Color.green()
-                )
-                embed.add_field(
-                    name="New Prices",
-                    value=(
-                        "• Standard roles: 50,000 coins\n"
-                        "• VIP role: 100,000 coins"
-                    ),
-                    inline=False
-                )
-                embed.add_field(
-                    name="Economy Balance",
-                    value=(
-                        "• Chat rewards: 10-50 coins per message\n"
-                        "• Daily rewards: 1,000-6,000 coins\n"
-                        "• Days to earn a role: ~2 weeks of regular activity"
-                    ),
-                    inline=False
-                )
-                await message.edit(content=None, embed=embed)
-            else:
-                await message.edit(content="❌ Failed to update shop prices. Check the console for errors.")
-                
+            # File reads and the repricing itself stay off the event loop: the rules are
+            # read in a worker thread, the diff and its single executemany run on the writer
+            version, rules = await asyncio.to_thread(load_price_rules, PRICES_FILE)
+            diff = await self.db.transaction(apply_new_prices, rules, version, ctx.guild.id, dry_run)
+        except (OSError, ValueError) as e:
+            return await message.edit(content=f"❌ Can't load pricing rules: {e}")
         except Exception as e:
-            await ctx.send(f"❌ Error updating prices: {e}")
+            log.exception("Repricing failed", guild_id=ctx.guild.id)
+            return await message.edit(content=f"❌ Error updating prices: {e}")
+        
+        if diff.changes and not dry_run:
+            await self.catalog_changed(ctx.guild.id)
+        
+        if dry_run:
+            title, color = "🔍 Price Preview", discord.Color.blue()
+        elif diff.changes:
+            title, color = "✅ Shop Prices Updated", discord.Color.green()
+        else:
+            title, color = "✅ Shop Prices Up to Date", discord.Color.green()
+        embed = discord.Embed(
+            title=title,
+            description=(
+                f"Pricing rules version **{version}**: {len(diff.changes)} item(s) "
+                f"{'would change' if dry_run else 'changed'}, {diff.unchanged} already at their price."
+            ),
+            color=color
+        )
+        if diff.changes:
+            embed.add_field(name="Changes", value=self.bullet_list(
+                f"{name}: {old_price:,} → {new_price:,} coins" for _, _, name, old_price, new_price in diff.changes
+            ), inline=False)
+        if diff.unmatched:
+            embed.add_field(name="Rules Not Applied", value=self.bullet_list(
+                f"{rule_item}: " + (f"matches {', '.join(candidates)}" if candidates else "no such item")
+                for _, rule_item, candidates in diff.unmatched
+            ), inline=False)
+        embed.set_footer(text=f"Admin: {ctx.author.name}")
+        embed.timestamp = datetime.datetime.now()
+        await message.edit(content=None, embed=embed)
+        
+    @staticmethod
+    def bullet_list(lines, limit=1024):
+        """Bullet lines that fit in an embed field, with a count of the ones that don't"""
+        lines = list(lines)
+        text = ""
+        for shown, line in enumerate(lines):
+            entry = f"• {line}\n"
+            # Leave room for the "… and N more" line unless this is the last entry
+            reserve = 0 if shown == len(lines) - 1 else len(f"… and {len(lines)} more")
+            if len(text) + len(entry) + reserve > limit:
+                return text + f"… and {len(lines) - shown} more"
+            text += entry
+        return text.rstrip("\n")
+
+    @admin.command(name="profile")
+    async def profile_bot(self, ctx, seconds: int = 10):
+        """Sample CPU and allocations for a few seconds and report the hot spots"""
+        if not 1 <= seconds <= 120:
+            return await ctx.send("❌ Profile duration must be between 1 and 120 seconds.")
+        if self.profiling:
+            return await ctx.send("❌ A profile is already running.")
+
+        self.profiling = True
+        try:
+            message = await ctx.send(f"⏳ Profiling for {seconds} seconds...")
+            result = await profile(seconds)
+        finally:
+            self.profiling = False
+
+        busy = result.busy_samples or 1
+        embed = discord.Embed(
+            title="🔬 Profile Results",
+            description=(
+                f"{seconds}s window, {result.profiler.samples:,} thread samples "
+                f"({result.busy_samples:,} busy). Percentages are of busy samples."
+            ),
+            color=discord.Color.blue()
+        )
+
+        lines = [
+            f"`{count * 100 / busy:5.1f}% {total * 100 / busy:5.1f}%` {self.short_location(function)}"
+            for function, count, total in result.top_functions(10)
+        ]
+        embed.add_field(
+            name="Top Functions (self, cumulative)",
+            value="\n".join(lines)[:1024] or "No busy samples",
+            inline=False
+        )
+
+        lines = [
+            f"`{stat.size_diff / 1024:8.1f} KiB` {os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}"
+            for stat in result.top_allocations(10)
+        ]
+        embed.add_field(
+            name="Top Allocation Sites (growth)",
+            value="\n".join(lines)[:1024] or "No allocation growth",
+            inline=False
+        )
+        embed.set_footer(text="Full stats and folded stacks (for flame graphs) are attached.")
+
+        files = [
+            discord.File(io.BytesIO(result.report().encode()), filename="profile.txt"),
+            discord.File(io.BytesIO(result.folded_stacks().encode()), filename="profile.folded")
+        ]
+        await message.edit(content=None, embed=embed, attachments=files)
+
+    @staticmethod
+    def short_location(function):
+        """'name (path/to/file.py:12)' -> 'name (file.py:12)' to fit in an embed"""
+        name, _, location = function.partition(" (")
+        return f"{name} ({os.path.basename(location)}"
 
 async def setup(bot):
     await bot.add_cog(AdminTools(bot)) 
\ No newline at end of file
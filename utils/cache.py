@@ -0,0 +1,66 @@
+from collections import OrderedDict
+
+class LRUCache:
+    """Bounded least-recently-used cache with hit/miss/eviction counters
+
+    Not thread-safe on its own, callers that share one across threads must lock.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        """Look up a key, counting the hit or miss and marking it recently used"""
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key, default=None):
+        """Look up a key without touching the counters or the LRU order"""
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entry if full"""
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.max_size:
+            self.data.popitem(last=False)
+            self.evictions += 1
+
+    def update_if_present(self, key, value):
+        """Overwrite a value only if the key is already cached"""
+        if key in self.data:
+            self.data[key] = value
+
+    def pop(self, key, default=None):
+        return self.data.pop(key, default)
+
+    def clear(self):
+        self.data.clear()
+
+    def stats(self):
+        """Counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
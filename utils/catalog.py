@@ -0,0 +1,78 @@
+import discord
+from utils.embeds import create_catalog_embed
+from utils.item_index import ItemIndex
+
+# Discord rejects select menus with more options than this
+PAGE_SIZE = 25
+
+# Category names travel in select values and button custom ids, which Discord caps at 100 characters
+MAX_CATEGORY_LENGTH = 50
+
+class CatalogSnapshot:
+    """Immutable view of shop_items plus everything the shop UI builds from it
+
+    Items are indexed by id, by normalized name (for admin commands and
+    autocomplete) and grouped by category. Select options are only built for
+    pages someone has opened, then reused by every later view.
+    """
+
+    def __init__(self, items):
+        self.items = items  # [(id, name, price, role_id, category), ...]
+        self.count = len(items)
+        self.by_id = {item[0]: item for item in items}
+        self.index = ItemIndex(items)
+        self.embed = create_catalog_embed(self.count)
+        self.ids_by_category = {}  # {category: [item id, ...]} in shop order
+        for item in items:
+            # Clipped so older, longer names still fit in select values and custom ids
+            self.ids_by_category.setdefault(item[4][:MAX_CATEGORY_LENGTH], []).append(item[0])
+        self.categories = sorted(self.ids_by_category)  # '' (uncategorized) sorts first
+        self.pages = {}  # {(category, page): [SelectOption, ...]}
+
+    def page_count(self, category):
+        return max(1, -(-len(self.ids_by_category.get(category, ())) // PAGE_SIZE))
+
+    def page(self, category, page):
+        """Select options for one page of a category"""
+        options = self.pages.get((category, page))
+        if options is None:
+            ids = self.ids_by_category.get(category, [])[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+            options = self.pages[category, page] = [
+                discord.SelectOption(label=self.by_id[item_id][1][:100], description=f"{self.by_id[item_id][2]} points", value=str(item_id))
+                for item_id in ids
+            ]
+        return options
+
+class ShopCatalog:
+    """In-memory shop catalogs, one per guild, loaded once and reloaded only after shop_items changes
+
+    Anything that writes to a guild's shop_items must call invalidate(guild_id) afterwards.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.snapshots = {}  # {guild_id: CatalogSnapshot}
+        self.versions = {}  # Bumped on every invalidation so in-progress loads can be discarded
+        self.loads = 0
+
+    async def get(self, guild_id):
+        """Return the guild's current snapshot, loading it from the database if needed"""
+        snapshot = self.snapshots.get(guild_id)
+        if snapshot is not None:
+            return snapshot
+
+        version = self.versions.get(guild_id, 0)
+        items = await self.db.fetchall(
+            "SELECT id, name, price, role_id, category FROM shop_items WHERE guild_id = ? ORDER BY id", (guild_id,)
+        )
+        snapshot = CatalogSnapshot(items)
+        self.loads += 1
+        # Only keep it if nothing changed the table while we were reading
+        if version == self.versions.get(guild_id, 0):
+            self.snapshots[guild_id] = snapshot
+        return snapshot
+
+    def invalidate(self, guild_id):
+        """Drop the guild's snapshot so the next get() reloads it"""
+        self.versions[guild_id] = self.versions.get(guild_id, 0) + 1
+        self.snapshots.pop(guild_id, None)
@@ -1,150 +1,149 @@
-import sqlite3
 import datetime
+import time
+import asyncio
+import os
 import discord
 from discord.ext import commands, tasks
 from utils.embeds import create_daily_reward_embed
-import os
-import time
+from utils.activity import ActivityTracker
+from utils.database import remote_callable
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+def start_of_today():
+    """Epoch seconds of local midnight, claims at or after it were made today"""
+    midnight = datetime.datetime.combine(datetime.date.today(), datetime.time.min)
+    return int(midnight.timestamp())
+
+@remote_callable
+def grant_daily_rewards(conn, ledger, accounts, rewards):
+    """Check eligibility, credit rewards and bump streaks for a batch in one transaction
+
+    Runs on the database writer, rewards is (base_reward, streak_bonus, max_streak_bonus).
+    Returns [(guild_id, user_id, reward_amount, streak), ...] for the accounts that
+    were actually rewarded.
+    """
+    base_reward, streak_bonus_per_day, max_streak_bonus = rewards
+    today = start_of_today()
+    
+    by_guild = {}
+    for guild_id, user_id in accounts:
+        by_guild.setdefault(guild_id, []).append(user_id)
+    
+    # Current claim state for the whole batch, per guild (chunked to stay under SQLite's variable limit)
+    claims = {}
+    for guild_id, user_ids in by_guild.items():
+        for i in range(0, len(user_ids), 500):
+            chunk = user_ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for user_id, last_claim, streak in conn.execute(
+                f"SELECT user_id, last_claim, streak FROM daily_rewards WHERE guild_id = ? AND user_id IN ({placeholders})",
+                (guild_id, *chunk)
+            ):
+                claims[guild_id, user_id] = (last_claim, streak)
+    
+    now = int(time.time())
+    grants = []
+    for account in accounts:
+        claim = claims.get(account)
+        if claim and claim[0] >= today:
+            continue  # Already claimed today
+        
+        streak = claim[1] + 1 if claim else 1
+        
+        # Calculate reward amount with streak bonus
+        streak_bonus = min(streak * streak_bonus_per_day, max_streak_bonus)
+        grants.append((*account, base_reward + streak_bonus, streak))
+    
+    if grants:
+        ledger.apply_credits(conn, [(guild_id, user_id, amount) for guild_id, user_id, amount, _ in grants])
+        conn.executemany(
+            "INSERT OR REPLACE INTO daily_rewards (guild_id, user_id, last_claim, streak) VALUES (?, ?, ?, ?)",
+            [(guild_id, user_id, now, streak) for guild_id, user_id, _, streak in grants]
+        )
+    return grants
 
 class DailyRewards(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.conn = self.connect_with_retry()
-        self.c = self.conn.cursor()
-        self.setup_database()
-        self.user_activity = {}  # Track user activity {user_id: minutes_active}
-        self.check_activity.start()
+        self.db = bot.db
+        # Distinct active minutes per (guild_id, user_id) over a sliding window, streaks are per guild
+        self.activity = ActivityTracker(window_minutes=int(os.getenv('ACTIVITY_WINDOW_MINUTES', '120')))
+        self.required_minutes = 10  # Active minutes needed to earn the daily reward
+        self.notify_tasks = set()  # Keep references to running notification tasks
         
         # Reward amounts (increased)
         self.base_reward = 1000  # Base daily reward (was 100)
         self.streak_bonus = 200  # Bonus per day of streak (was 20)
         self.max_streak_bonus = 5000  # Maximum streak bonus (was 500)
         
-    def connect_with_retry(self, max_retries=5, retry_delay=1):
-        """Connect to the database with retry logic"""
-        DB_PATH = os.getenv('DB_PATH', 'shop.db')
-        retries = 0
-        last_error = None
-        
-        while retries < max_retries:
-            try:
-                conn = sqlite3.connect(DB_PATH)
-                print(f"DailyRewards: Successfully connected to database at {DB_PATH}")
-                return conn
-            except sqlite3.Error as e:
-                last_error = e
-                retries += 1
-                print(f"DailyRewards: Database connection error (attempt {retries}/{max_retries}): {e}")
-                if retries < max_retries:
-                    time.sleep(retry_delay)
-                    retry_delay *= 1.5  # Exponential backoff
-        
-        # If we get here, all retries failed
-        raise last_error or sqlite3.Error("DailyRewards: Failed to connect to database after multiple attempts")
-        
-    def setup_database(self):
-        """Set up the daily rewards table"""
-        try:
-            self.c.execute('''CREATE TABLE IF NOT EXISTS daily_rewards 
-                           (user_id INTEGER PRIMARY KEY, 
-                            last_claim TIMESTAMP,
-                            streak INTEGER DEFAULT 0)''')
-            self.conn.commit()
-            print("DailyRewards: Database tables initialized")
-        except sqlite3.Error as e:
-            print(f"DailyRewards: Error setting up database: {e}")
+    async def cog_load(self):
+        self.check_activity.start()
         
     def cog_unload(self):
         self.check_activity.cancel()
-        self.conn.close()
         
     @tasks.loop(minutes=1)
     async def check_activity(self):
         """Check user activity every minute"""
-        # Process users who have been active for 10+ minutes
-        for user_id, minutes in list(self.user_activity.items()):
-            if minutes >= 10:
-                # User has been active for 10+ minutes, eligible for daily reward
-                self.user_activity.pop(user_id)  # Remove from tracking
-                
-                try:
-                    # Check if they already claimed today
-                    today = datetime.datetime.now().date()
-                    self.c.execute("SELECT last_claim, streak FROM daily_rewards WHERE user_id = ?", (user_id,))
-                    result = self.c.fetchone()
-                    
-                    if not result or datetime.datetime.fromisoformat(result[0]).date() < today:
-                        # Eligible for reward
-                        await self.give_daily_reward(user_id)
-                except Exception as e:
-                    print(f"DailyRewards: Error checking activity for user {user_id}: {e}")
+        # Forget users who have gone quiet so memory stays flat
+        self.activity.expire()
+        
+        # Accounts that have been active for 10+ distinct minutes (removed from tracking)
+        eligible = self.activity.pop_eligible(self.required_minutes)
+        if eligible:
+            await self.give_daily_rewards(eligible)
     
     @check_activity.before_loop
     async def before_check_activity(self):
         await self.bot.wait_until_ready()
         
-    async def track_user_activity(self, user_id):
-        """Track a user's activity"""
-        if user_id not in self.user_activity:
-            self.user_activity[user_id] = 0
-        else:
-            self.user_activity[user_id] += 1
+    async def track_user_activity(self, guild_id, user_id):
+        """Track a user's activity in a guild"""
+        self.activity.record((guild_id, user_id))
             
-    async def give_daily_reward(self, user_id):
-        """Give a daily reward to the user"""
+    async def give_daily_rewards(self, accounts):
+        """Give daily rewards to every (guild_id, user_id) in the batch that hasn't claimed today"""
         try:
-            # Check current streak
-            self.c.execute("SELECT streak FROM daily_rewards WHERE user_id = ?", (user_id,))
-            result = self.c.fetchone()
-            
-            streak = 1
-            if result:
-                streak = result[0] + 1
-            
-            # Calculate reward amount with streak bonus
-            streak_bonus = min(streak * self.streak_bonus, self.max_streak_bonus)
-            reward_amount = self.base_reward + streak_bonus
-            
-            # Update user balance
-            self.c.execute("SELECT balance FROM users WHERE user_id = ?", (user_id,))
-            result = self.c.fetchone()
-            
-            if result:
-                new_balance = result[0] + reward_amount
-                self.c.execute("UPDATE users SET balance = ? WHERE user_id = ?", (new_balance, user_id))
-            else:
-                # User not in database yet
-                self.c.execute("INSERT INTO users (user_id, balance) VALUES (?, ?)", (user_id, reward_amount))
-            
-            # Update daily rewards record
-            now = datetime.datetime.now().isoformat()
-            self.c.execute(
-                "INSERT OR REPLACE INTO daily_rewards (user_id, last_claim, streak) VALUES (?, ?, ?)",
-                (user_id, now, streak)
+            grants = await self.bot.ledger.transaction(
+                grant_daily_rewards, accounts, (self.base_reward, self.streak_bonus, self.max_streak_bonus)
             )
-            
-            self.conn.commit()
-            
-            # Try to notify the user
+        except Exception as e:
+            log.error("Error giving daily rewards", accounts=len(accounts), error=e)
+            return []
+        
+        # Notifications are REST calls, send them after the transaction and off the loop task
+        if grants:
+            task = asyncio.create_task(self.notify_rewards(grants))
+            self.notify_tasks.add(task)
+            task.add_done_callback(self.notify_tasks.discard)
+        return grants
+    
+    async def give_daily_reward(self, guild_id, user_id):
+        """Give a daily reward to a single user"""
+        return await self.give_daily_rewards([(guild_id, user_id)])
+    
+    async def notify_rewards(self, grants):
+        """DM each rewarded user"""
+        for guild_id, user_id, reward_amount, streak in grants:
             try:
-                user = await self.bot.fetch_user(user_id)
+                user = await self.bot.user_resolver.resolve(user_id, guild_id)
                 if user:
                     embed = create_daily_reward_embed(reward_amount, streak)
                     await user.send(embed=embed)
             except Exception as e:
-                print(f"Failed to send daily reward notification: {e}")
-                
-        except Exception as e:
-            print(f"Error giving daily reward: {e}")
+                log.warning("Failed to send daily reward notification", user_id=user_id, error=e)
     
     @commands.command(name="daily")
     async def daily_status(self, ctx):
         """Check your daily reward status"""
         user_id = ctx.author.id
-        today = datetime.datetime.now().date()
+        today = start_of_today()
         
-        self.c.execute("SELECT last_claim, streak FROM daily_rewards WHERE user_id = ?", (user_id,))
-        result = self.c.fetchone()
+        result = await self.db.fetchone(
+            "SELECT last_claim, streak FROM daily_rewards WHERE guild_id = ? AND user_id = ?", (ctx.guild.id, user_id)
+        )
         
         if not result:
             embed = discord.Embed(
@@ -154,10 +153,9 @@ class DailyRewards(commands.Cog):
             )
             embed.set_footer(text="Active = sending messages or using voice channels")
         else:
-            last_claim_date = datetime.datetime.fromisoformat(result[0]).date()
-            streak = result[1]
+            last_claim, streak = result
             
-            if last_claim_date >= today:
+            if last_claim >= today:
                 embed = discord.Embed(
                     title="🎁 Daily Reward",
                     description="You've already claimed your daily reward today!",
@@ -179,8 +177,8 @@ class DailyRewards(commands.Cog):
     @commands.Cog.listener()
     async def on_message(self, message):
         """Track activity when users send messages"""
-        if not message.author.bot:
-            await self.track_user_activity(message.author.id)
+        if not message.author.bot and message.guild is not None:
+            await self.track_user_activity(message.guild.id, message.author.id)
             
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
@@ -188,7 +186,7 @@ class DailyRewards(commands.Cog):
         if not member.bot:
             if before.channel is None and after.channel is not None:
                 # User joined a voice channel
-                await self.track_user_activity(member.id)
+                await self.track_user_activity(member.guild.id, member.id)
 
 async def setup(bot):
     await bot.add_cog(DailyRewards(bot)) 
\ No newline at end of file
@@ -0,0 +1,233 @@
+import asyncio
+import functools
+import importlib
+import os
+import queue
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.metrics import db_query_errors, db_query_seconds, query_type
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+class DatabaseConfig:
+    """Connection settings, read from environment variables"""
+
+    def __init__(self):
+        self.db_path = os.getenv('DB_PATH', 'shop.db')
+        self.journal_mode = os.getenv('DB_JOURNAL_MODE', 'WAL')
+        self.synchronous = os.getenv('DB_SYNCHRONOUS', 'NORMAL')
+        self.cache_size = int(os.getenv('DB_CACHE_SIZE', '-16000'))  # Negative = KiB, so ~16MB
+        self.mmap_size = int(os.getenv('DB_MMAP_SIZE', str(64 * 1024 * 1024)))
+        self.busy_timeout = int(os.getenv('DB_BUSY_TIMEOUT', '5000'))  # Milliseconds
+        self.read_pool_size = int(os.getenv('DB_READ_POOL_SIZE', '2'))
+
+def connect(config=None, read_only=False):
+    """Open a connection with the shared pragmas applied"""
+    config = config or DatabaseConfig()
+    conn = sqlite3.connect(config.db_path, timeout=config.busy_timeout / 1000, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout = {config.busy_timeout}")
+    if not read_only:
+        # journal_mode is persistent in the file, only the writer needs to set it
+        conn.execute(f"PRAGMA journal_mode = {config.journal_mode}")
+    conn.execute(f"PRAGMA synchronous = {config.synchronous}")
+    conn.execute(f"PRAGMA cache_size = {config.cache_size}")
+    conn.execute(f"PRAGMA mmap_size = {config.mmap_size}")
+    if read_only:
+        conn.execute("PRAGMA query_only = ON")
+    return conn
+
+class ConnectionPool:
+    """Fixed-size pool of read-only connections"""
+
+    def __init__(self, config, size):
+        self.connections = queue.Queue()
+        for _ in range(size):
+            self.connections.put(connect(config, read_only=True))
+
+    def acquire(self):
+        return self.connections.get()
+
+    def release(self, conn):
+        self.connections.put(conn)
+
+    def close(self):
+        while not self.connections.empty():
+            self.connections.get_nowait().close()
+
+def remote_callable(func):
+    """Mark a transaction function as safe to run by name in the ledger process
+
+    Sharded bots send transactions to utils.ledger_server as "module:qualname"
+    strings, and the server only runs functions carrying this mark.
+    """
+    func.remote_name = f"{func.__module__}:{func.__qualname__}"
+    return func
+
+def remote_name(func):
+    """Name a transaction function is sent under, raises ValueError if it isn't marked"""
+    name = getattr(func, "remote_name", None)
+    if name is None:
+        raise ValueError(f"{getattr(func, '__qualname__', func)!r} is not marked with @remote_callable")
+    return name
+
+def resolve_remote(name):
+    """Inverse of remote_name, imports the module if needed"""
+    module, _, qualname = name.partition(":")
+    func = getattr(importlib.import_module(module), qualname, None)
+    if getattr(func, "remote_name", None) != name:
+        raise LookupError(f"{name} is not a remote callable")
+    return func
+
+def _func_label(func, args):
+    """Metrics label for a callable run on a worker thread, e.g. "transaction record_purchase" """
+    name = getattr(func, "__name__", "call").lstrip("_")
+    if "transaction" in name and args and callable(args[0]):
+        return f"transaction {getattr(args[0], '__name__', 'call').lstrip('_')}"
+    return name
+
+class Database:
+    """Async data-access layer that owns every SQLite connection the bot uses
+
+    Writes go through a single writer connection on a dedicated thread, so they
+    run one at a time and in the order they were submitted. Plain reads run on a
+    small pool of read-only connections, which WAL mode lets proceed while a
+    write is in progress. Nothing here ever blocks the event loop.
+    """
+
+    read_only = False  # Subclasses that send writes elsewhere open the "writer" read-only
+
+    def __init__(self, config=None, max_retries=5, retry_delay=1):
+        self.config = config or DatabaseConfig()
+        self.db_path = self.config.db_path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self.read_executor = ThreadPoolExecutor(
+            max_workers=self.config.read_pool_size,
+            thread_name_prefix="db-reader"
+        )
+        self.conn = None
+        # Open the writer on the thread that will use it (this also switches the file to WAL)
+        self.call(self.connect_with_retry, max_retries, retry_delay)
+        self.pool = ConnectionPool(self.config, self.config.read_pool_size)
+
+    def connect_with_retry(self, max_retries=5, retry_delay=1):
+        """Connect to the database with retry logic"""
+        retries = 0
+        last_error = None
+
+        while retries < max_retries:
+            try:
+                self.conn = connect(self.config, read_only=self.read_only)
+                log.info("Connected to database", path=self.db_path)
+                return
+            except sqlite3.Error as e:
+                last_error = e
+                retries += 1
+                log.warning("Connection error", attempt=retries, max_retries=max_retries, error=e)
+                if retries < max_retries:
+                    time.sleep(retry_delay)
+                    retry_delay *= 1.5  # Exponential backoff
+
+        # If all retries fail, run diagnostics
+        from utils.db_monitor import check_db_status
+        check_db_status()
+        raise last_error or sqlite3.Error("Database: Failed to connect to database after multiple attempts")
+
+    def call(self, func, *args):
+        """Run func(*args) on the writer thread and wait for the result (blocking)"""
+        return self.executor.submit(func, *args).result()
+
+    async def run(self, func, *args):
+        """Run func(*args) on the writer thread without blocking the event loop"""
+        return await self._submit(self.executor, _func_label(func, args), func, *args)
+
+    async def run_read(self, func, *args):
+        """Run func(conn, *args) with a pooled read-only connection"""
+        return await self._submit(self.read_executor, _func_label(func, args), self._with_reader, func, *args)
+
+    async def _submit(self, executor, label, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(self._timed, label, func, *args))
+
+    @staticmethod
+    def _timed(label, func, *args):
+        """Run func on the current worker thread, recording its duration under label
+
+        Timing starts on the worker, so time spent queued behind other work is
+        not counted as query time.
+        """
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        except Exception:
+            db_query_errors.inc(label)
+            raise
+        finally:
+            db_query_seconds.observe(time.perf_counter() - start, label)
+
+    def _with_reader(self, func, *args):
+        conn = self.pool.acquire()
+        try:
+            return func(conn, *args)
+        finally:
+            self.pool.release(conn)
+
+    async def transaction(self, func, *args):
+        """Run func(conn, *args) inside a single transaction on the writer thread"""
+        return await self.run(self._transaction, func, *args)
+
+    def transaction_sync(self, func, *args):
+        """Blocking version of transaction() for startup and shutdown code"""
+        return self.call(self._transaction, func, *args)
+
+    def _transaction(self, func, *args):
+        with self.conn:
+            return func(self.conn, *args)
+
+    async def fetchone(self, sql, params=(), primary=False):
+        """Run a query and return the first row
+
+        Pass primary=True to read through the writer connection instead of the
+        pool, which orders the read after every write submitted before it.
+        """
+        if primary:
+            return await self._submit(self.executor, query_type(sql), self._fetchone, self.conn, sql, params)
+        return await self._submit(self.read_executor, query_type(sql), self._with_reader, self._fetchone, sql, params)
+
+    def _fetchone(self, conn, sql, params):
+        return conn.execute(sql, params).fetchone()
+
+    async def fetchall(self, sql, params=(), primary=False):
+        """Run a query and return all rows (see fetchone for primary)"""
+        if primary:
+            return await self._submit(self.executor, query_type(sql), self._fetchall, self.conn, sql, params)
+        return await self._submit(self.read_executor, query_type(sql), self._with_reader, self._fetchall, sql, params)
+
+    def _fetchall(self, conn, sql, params):
+        return conn.execute(sql, params).fetchall()
+
+    async def execute(self, sql, params=()):
+        """Run a single write statement and commit it, returning the affected row count"""
+        return await self._submit(self.executor, query_type(sql), self._execute, sql, params)
+
+    def _execute(self, sql, params):
+        with self.conn:
+            return self.conn.execute(sql, params).rowcount
+
+    async def executemany(self, sql, seq_of_params):
+        """Run a statement for every parameter set in one transaction"""
+        return await self._submit(self.executor, query_type(sql), self._executemany, sql, list(seq_of_params))
+
+    def _executemany(self, sql, seq_of_params):
+        with self.conn:
+            return self.conn.executemany(sql, seq_of_params).rowcount
+
+    def close(self):
+        """Close every connection and stop the worker threads"""
+        self.read_executor.shutdown(wait=True)
+        self.pool.close()
+        if self.conn:
+            self.call(self.conn.close)
+            self.conn = None
+        self.executor.shutdown(wait=True)
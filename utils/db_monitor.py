@@ -1,50 +1,57 @@
 import os
-import sqlite3
 import datetime
 import sys
+from utils.database import DatabaseConfig, connect
+from utils.log import get_logger, setup_logging
+from utils.migrations import migrate
+
+log = get_logger(__name__)
 
 def check_db_status():
     """
     Utility function to check database status and perform basic diagnostics.
     Can be run manually via the command line or imported and used in the bot.
     """
-    db_path = os.getenv('DB_PATH', 'shop.db')
+    config = DatabaseConfig()
+    db_path = config.db_path
     data_dir = os.path.dirname(db_path) if '/' in db_path else '.'
     
-    print(f"\n===== DATABASE STATUS CHECK =====")
-    print(f"Timestamp: {datetime.datetime.now().isoformat()}")
-    print(f"Database Path: {db_path}")
-    print(f"Data Directory: {data_dir}")
+    log.info(
+        "Database status check", timestamp=datetime.datetime.now().isoformat(),
+        path=db_path, data_dir=data_dir
+    )
     
     # Check if data directory exists and is writable
     if os.path.exists(data_dir):
-        print(f"✅ Data directory exists")
+        log.info("✅ Data directory exists")
         if os.access(data_dir, os.W_OK):
-            print(f"✅ Data directory is writable")
+            log.info("✅ Data directory is writable")
         else:
-            print(f"❌ Data directory is NOT writable!")
-            print(f"   Directory permissions: {oct(os.stat(data_dir).st_mode & 0o777)}")
-            print(f"   Directory owner: {os.stat(data_dir).st_uid}")
+            log.error(
+                "❌ Data directory is NOT writable!",
+                permissions=oct(os.stat(data_dir).st_mode & 0o777), owner=os.stat(data_dir).st_uid
+            )
     else:
-        print(f"❌ Data directory does NOT exist!")
+        log.error("❌ Data directory does NOT exist!")
         try:
             os.makedirs(data_dir, exist_ok=True)
-            print(f"✅ Created data directory")
+            log.info("✅ Created data directory")
         except Exception as e:
-            print(f"❌ Failed to create data directory: {e}")
+            log.error("❌ Failed to create data directory", error=e)
     
     # Check if database file exists
     if os.path.exists(db_path):
-        print(f"✅ Database file exists")
-        print(f"   Size: {os.path.getsize(db_path)} bytes")
-        print(f"   Last modified: {datetime.datetime.fromtimestamp(os.path.getmtime(db_path)).isoformat()}")
+        log.info(
+            "✅ Database file exists", size_bytes=os.path.getsize(db_path),
+            modified=datetime.datetime.fromtimestamp(os.path.getmtime(db_path)).isoformat()
+        )
     else:
-        print(f"❌ Database file does NOT exist!")
+        log.error("❌ Database file does NOT exist!")
     
-    # Try connecting to database
+    # Try connecting to database (read-only, with the bot's busy timeout, so a running bot isn't disturbed)
     try:
-        conn = sqlite3.connect(db_path)
-        print(f"✅ Successfully connected to database")
+        conn = connect(config, read_only=True)
+        log.info("✅ Successfully connected to database")
         
         cursor = conn.cursor()
         
@@ -52,81 +59,62 @@ def check_db_status():
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
         tables = cursor.fetchall()
         if tables:
-            print(f"✅ Database has {len(tables)} tables:")
+            log.info("Database tables", count=len(tables))
             for table in tables:
                 cursor.execute(f"SELECT COUNT(*) FROM {table[0]}")
                 count = cursor.fetchone()[0]
-                print(f"   - {table[0]}: {count} rows")
+                log.info("Table", table=table[0], rows=count)
+        else:
+            log.error("❌ Database has no tables!")
+        
+        # Check schema version (databases from before migrations have no table)
+        if any(table[0] == 'schema_version' for table in tables):
+            version = cursor.execute("SELECT MAX(version) FROM schema_version").fetchone()[0]
+            log.info("Schema version", version=version)
         else:
-            print(f"❌ Database has no tables!")
+            log.warning("⚠️ No schema_version table, the bot will migrate this database on startup")
         
         conn.close()
     except Exception as e:
-        print(f"❌ Failed to connect to database: {e}")
-    
-    print("================================\n")
+        log.error("❌ Failed to connect to database", error=e)
     
 def reset_database():
     """Reset the database by deleting it and recreating tables"""
-    db_path = os.getenv('DB_PATH', 'shop.db')
+    config = DatabaseConfig()
+    db_path = config.db_path
     
-    print(f"\n===== DATABASE RESET =====")
+    log.info("Database reset", path=db_path)
     
-    # Delete the database file if it exists
-    if os.path.exists(db_path):
-        try:
-            os.remove(db_path)
-            print(f"✅ Deleted existing database: {db_path}")
-        except Exception as e:
-            print(f"❌ Failed to delete database: {e}")
-            return False
+    # Delete the database file and its WAL and shared-memory files, a stale WAL
+    # left behind would be replayed into the new database
+    for path in (db_path, db_path + "-wal", db_path + "-shm"):
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+                log.info("✅ Deleted existing database file", path=path)
+            except Exception as e:
+                log.error("❌ Failed to delete database file", path=path, error=e)
+                return False
     
-    # Create a new database with tables
+    # Create a new database through the migrations, same schema as the bot creates
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Create users table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY,
-            balance INTEGER DEFAULT 0,
-            last_activity TEXT
-        )
-        ''')
-        
-        # Create shop_items table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS shop_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            price INTEGER NOT NULL,
-            role_id INTEGER NOT NULL
-        )
-        ''')
-        
-        # Create admin_roles table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS admin_roles (
-            role_id INTEGER PRIMARY KEY
-        )
-        ''')
-        
-        conn.commit()
-        print(f"✅ Created new database with tables")
+        conn = connect(config)
+        applied = migrate(conn)
+        log.info("✅ Created new database", schema_version=applied[-1])
         conn.close()
         return True
     except Exception as e:
-        print(f"❌ Failed to create new database: {e}")
+        log.error("❌ Failed to create new database", error=e)
         return False
 
 if __name__ == "__main__":
+    setup_logging()
     # When run directly, perform database status check
     if len(sys.argv) > 1 and sys.argv[1] == "--reset":
         if reset_database():
-            print("Database has been reset successfully!")
+            log.info("Database has been reset successfully!")
         else:
-            print("Failed to reset database.")
+            log.error("Failed to reset database.")
         
         # Also perform a status check after reset
         check_db_status()
@@ -1,20 +1,68 @@
 import discord
 import datetime
 
-def create_balance_embed(user, balance):
-    """Create an embed for displaying user balance"""
+# Template layer: the static parts of each embed are built once, cached under a
+# key made of whatever inputs change them, and cloned for every call so only the
+# dynamic parts (descriptions, thumbnails, timestamps) are filled in per call.
+_templates = {}
+_new_embed = discord.Embed.__new__
+
+def _snapshot(embed):
+    """Record the slot values a template embed has set, so clones can skip the rest"""
+    values = []
+    for slot in discord.Embed.__slots__:
+        if slot == "_fields":
+            continue
+        try:
+            values.append((slot, getattr(embed, slot)))
+        except AttributeError:
+            pass  # Unset slots (no image, no author...) stay unset on the clone
+    return values, getattr(embed, "_fields", None)
+
+def _clone(snapshot):
+    """Build an embed from a template snapshot
+
+    Much cheaper than constructing one or calling Embed.copy(), which round-trips
+    through to_dict/from_dict. Fields are copied because set_field_at edits them
+    in place; the other nested dicts (footer, thumbnail...) are shared, which is
+    safe because their setters always replace them rather than modifying them.
+    """
+    values, fields = snapshot
+    embed = _new_embed(discord.Embed)
+    for slot, value in values:
+        setattr(embed, slot, value)
+    if fields is not None:
+        embed._fields = [field.copy() for field in fields]
+    return embed
+
+def from_template(key, builder):
+    """Return a copy of the cached template for key, building it with builder() on first use"""
+    snapshot = _templates.get(key)
+    if snapshot is None:
+        snapshot = _templates[key] = _snapshot(builder())
+    return _clone(snapshot)
+
+def clear_templates():
+    """Drop every cached template (e.g. after changing their text)"""
+    _templates.clear()
+
+def _balance_template():
     embed = discord.Embed(
         title="💰 Wallet Balance",
-        description=f"{user.mention}, you have **{balance:,}** coins in your wallet.",
         color=discord.Color.gold()
     )
-    embed.set_thumbnail(url=user.display_avatar.url)
     embed.set_footer(text="Earn more coins by chatting and claiming daily rewards!")
+    return embed
+
+def create_balance_embed(user, balance):
+    """Create an embed for displaying user balance"""
+    embed = from_template("balance", _balance_template)
+    embed.description = f"{user.mention}, you have **{balance:,}** coins in your wallet."
+    embed.set_thumbnail(url=user.display_avatar.url)
     embed.timestamp = datetime.datetime.now()
     return embed
 
-def create_shop_embed():
-    """Create an embed for displaying the shop"""
+def _shop_template():
     embed = discord.Embed(
         title="🛍️ BitBuddy Shop",
         description="Buy special roles with your coins!",
@@ -38,38 +86,65 @@ def create_shop_embed():
     embed.set_footer(text="Prices are subject to change.")
     return embed
 
-def create_purchase_embed(item_name, price, success=True):
-    """Create an embed for purchase result"""
+def create_shop_embed():
+    """Create an embed for displaying the shop"""
+    return from_template("shop", _shop_template)
+
+def _catalog_template(item_count):
+    embed = discord.Embed(
+        title="🏪 Shop",
+        description="Welcome to the shop! Use the dropdown menu below to browse and purchase items.",
+        color=discord.Color.blue()
+    )
+    embed.add_field(
+        name="How to Shop",
+        value="1. Select an item from the dropdown menu\n2. Review the item details\n3. Click Confirm to purchase or Cancel to abort",
+        inline=False
+    )
+    embed.add_field(
+        name="Available Items",
+        value=f"There are currently {item_count} items available for purchase.",
+        inline=False
+    )
+    embed.set_footer(text="All purchases are final. Please ensure you have enough points before confirming.")
+    return embed
+
+def create_catalog_embed(item_count):
+    """Create the embed shown above the shop item dropdown"""
+    return from_template(("catalog", item_count), lambda: _catalog_template(item_count))
+
+def _purchase_template(success):
     if success:
         embed = discord.Embed(
             title="✅ Purchase Successful!",
-            description=f"You have successfully purchased **{item_name}** for **{price:,}** coins!",
             color=discord.Color.green()
         )
         embed.set_footer(text="Enjoy your new role!")
     else:
         embed = discord.Embed(
             title="❌ Purchase Failed",
-            description=f"You don't have enough coins to purchase **{item_name}** ({price:,} coins).",
             color=discord.Color.red()
         )
         embed.set_footer(text="Keep chatting to earn more coins!")
     return embed
 
-def create_daily_reward_embed(amount, streak):
-    """Create an embed for daily reward notification"""
-    if streak > 1:
-        title = f"🎁 Daily Reward Claimed! (Streak: {streak} days)"
-        description = f"You've received **{amount:,}** coins for your daily activity!"
-        footer = f"Come back tomorrow to keep your streak going!"
+def create_purchase_embed(item_name, price, success=True):
+    """Create an embed for purchase result"""
+    embed = from_template(("purchase", success), lambda: _purchase_template(success))
+    if success:
+        embed.description = f"You have successfully purchased **{item_name}** for **{price:,}** coins!"
+    else:
+        embed.description = f"You don't have enough coins to purchase **{item_name}** ({price:,} coins)."
+    return embed
+
+def _daily_reward_template(has_streak):
+    if has_streak:
+        footer = "Come back tomorrow to keep your streak going!"
     else:
-        title = "🎁 Daily Reward Claimed!"
-        description = f"You've received **{amount:,}** coins for your daily activity!"
         footer = "Come back tomorrow to start a streak for bonus rewards!"
     
     embed = discord.Embed(
-        title=title,
-        description=description,
+        title="🎁 Daily Reward Claimed!",
         color=discord.Color.green()
     )
     embed.add_field(
@@ -78,4 +153,49 @@ def create_daily_reward_embed(amount, streak):
         inline=False
     )
     embed.set_footer(text=footer)
+    return embed
+
+def create_daily_reward_embed(amount, streak):
+    """Create an embed for daily reward notification"""
+    has_streak = streak > 1
+    embed = from_template(("daily_reward", has_streak), lambda: _daily_reward_template(has_streak))
+    if has_streak:
+        embed.title = f"🎁 Daily Reward Claimed! (Streak: {streak} days)"
+    embed.description = f"You've received **{amount:,}** coins for your daily activity!"
+    return embed
+
+def _leaderboard_template():
+    return discord.Embed(
+        title="🏆 Leaderboard",
+        color=discord.Color.gold()
+    )
+
+def create_leaderboard_embed(entries, page, total_pages, start_rank):
+    """Create an embed for one page of the leaderboard"""
+    embed = from_template("leaderboard", _leaderboard_template)
+    if entries:
+        medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+        lines = [
+            f"{medals.get(rank, f'**#{rank}**')} <@{user_id}> - **{balance:,}** coins"
+            for rank, (user_id, balance) in enumerate(entries, start=start_rank)
+        ]
+        embed.description = "\n".join(lines)
+    else:
+        embed.description = "Nobody is on this page yet. Keep chatting to earn coins!"
+    embed.set_footer(text=f"Page {page}/{total_pages} • Updated every minute")
+    return embed
+
+def _rank_template():
+    embed = discord.Embed(
+        title="📊 Rank",
+        color=discord.Color.gold()
+    )
+    embed.set_footer(text="Ranks are updated every minute")
+    return embed
+
+def create_rank_embed(user, rank, total_users, balance):
+    """Create an embed for displaying a user's rank"""
+    embed = from_template("rank", _rank_template)
+    embed.description = f"{user.mention} is ranked **#{rank:,}** of {total_users:,} with **{balance:,}** coins."
+    embed.set_thumbnail(url=user.display_avatar.url)
     return embed 
\ No newline at end of file
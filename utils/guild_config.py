@@ -0,0 +1,157 @@
+from utils.database import remote_callable
+from utils.migrations import LEGACY_GUILD
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+# Tables holding guild-scoped rows, in the order legacy data is claimed
+GUILD_TABLES = ("users", "daily_rewards", "shop_items", "admin_roles", "purchases", "guild_config", "command_channels")
+
+class GuildConfig:
+    """Channels and admin roles for one guild (0 means a channel or message isn't set)"""
+
+    def __init__(self, guild_id, shop_channel_id=0, points_channel_id=0, command_channels=(), admin_role_ids=(), shop_message_id=0):
+        self.guild_id = guild_id
+        self.shop_channel_id = shop_channel_id
+        self.points_channel_id = points_channel_id
+        self.shop_message_id = shop_message_id  # The persistent shop message in shop_channel_id
+        self.command_channels = set(command_channels)
+        self.admin_role_ids = set(admin_role_ids)
+
+    def allows_commands(self, channel_id):
+        """Commands work in the command channels, or anywhere until the guild sets some"""
+        return not self.command_channels or channel_id in self.command_channels
+
+@remote_callable
+def claim_legacy_data(conn, guild_id):
+    """Move rows stored before guild scoping to guild_id (runs inside a transaction)
+
+    UPDATE OR IGNORE skips rows the guild already has under the same key,
+    those stay under LEGACY_GUILD. Returns {table: rows moved}.
+    """
+    return {
+        table: conn.execute(f"UPDATE OR IGNORE {table} SET guild_id = ? WHERE guild_id = ?", (guild_id, LEGACY_GUILD)).rowcount
+        for table in GUILD_TABLES
+    }
+
+class GuildConfigStore:
+    """Every guild's config, loaded once at startup and kept in memory
+
+    Command checks and the message handler read it on every event, so reads
+    never touch the database. Changes are written through to the database.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.configs = {}  # {guild_id: GuildConfig}, only guilds that configured something
+        self.legacy_pending = False  # Rows from before guild scoping are waiting to be claimed
+
+    def load_sync(self):
+        """Blocking load for startup"""
+        self.db.call(self._load)
+
+    def _load(self):
+        conn = self.db.conn
+        configs = {}
+        for guild_id, shop_channel_id, points_channel_id, shop_message_id in conn.execute(
+            "SELECT guild_id, shop_channel_id, points_channel_id, shop_message_id FROM guild_config"
+        ):
+            configs[guild_id] = GuildConfig(guild_id, shop_channel_id, points_channel_id, shop_message_id=shop_message_id)
+        for guild_id, channel_id in conn.execute("SELECT guild_id, channel_id FROM command_channels"):
+            configs.setdefault(guild_id, GuildConfig(guild_id)).command_channels.add(channel_id)
+        for guild_id, role_id in conn.execute("SELECT guild_id, role_id FROM admin_roles"):
+            configs.setdefault(guild_id, GuildConfig(guild_id)).admin_role_ids.add(role_id)
+
+        # Every table has a guild_id-first key, so these are index probes
+        self.legacy_pending = any(
+            conn.execute(f"SELECT 1 FROM {table} WHERE guild_id = ? LIMIT 1", (LEGACY_GUILD,)).fetchone()
+            for table in ("users", "daily_rewards", "shop_items", "admin_roles")
+        )
+        configs.pop(LEGACY_GUILD, None)
+        self.configs = configs
+        log.info("Loaded guild configs", guilds=len(configs), legacy_pending=self.legacy_pending)
+
+    def get(self, guild_id):
+        """Config for a guild, an empty one if it hasn't configured anything"""
+        config = self.configs.get(guild_id)
+        if config is None:
+            return GuildConfig(guild_id)
+        return config
+
+    def _config(self, guild_id):
+        config = self.configs.get(guild_id)
+        if config is None:
+            config = self.configs[guild_id] = GuildConfig(guild_id)
+        return config
+
+    async def set_channel(self, guild_id, kind, channel_id):
+        """Set the "shop" or "points" channel
+
+        Moving the shop forgets the shop message, the next refresh posts one in the new channel.
+        """
+        column = {"shop": "shop_channel_id", "points": "points_channel_id"}[kind]
+        moved = kind == "shop" and self.get(guild_id).shop_channel_id != channel_id
+        reset = ", shop_message_id = 0" if moved else ""
+        await self.db.execute(
+            f'''INSERT INTO guild_config (guild_id, {column}) VALUES (?, ?)
+                ON CONFLICT(guild_id) DO UPDATE SET {column} = excluded.{column}{reset}''',
+            (guild_id, channel_id)
+        )
+        config = self._config(guild_id)
+        setattr(config, column, channel_id)
+        if moved:
+            config.shop_message_id = 0
+
+    async def set_shop_message(self, guild_id, message_id):
+        await self.db.execute(
+            '''INSERT INTO guild_config (guild_id, shop_message_id) VALUES (?, ?)
+               ON CONFLICT(guild_id) DO UPDATE SET shop_message_id = excluded.shop_message_id''',
+            (guild_id, message_id)
+        )
+        self._config(guild_id).shop_message_id = message_id
+
+    async def add_command_channel(self, guild_id, channel_id):
+        await self.db.execute(
+            "INSERT OR IGNORE INTO command_channels (guild_id, channel_id) VALUES (?, ?)", (guild_id, channel_id)
+        )
+        self._config(guild_id).command_channels.add(channel_id)
+
+    async def remove_command_channel(self, guild_id, channel_id):
+        await self.db.execute(
+            "DELETE FROM command_channels WHERE guild_id = ? AND channel_id = ?", (guild_id, channel_id)
+        )
+        self._config(guild_id).command_channels.discard(channel_id)
+
+    async def add_admin_role(self, guild_id, role_id):
+        await self.db.execute(
+            "INSERT OR IGNORE INTO admin_roles (guild_id, role_id) VALUES (?, ?)", (guild_id, role_id)
+        )
+        self._config(guild_id).admin_role_ids.add(role_id)
+
+    async def remove_admin_role(self, guild_id, role_id):
+        await self.db.execute(
+            "DELETE FROM admin_roles WHERE guild_id = ? AND role_id = ?", (guild_id, role_id)
+        )
+        self._config(guild_id).admin_role_ids.discard(role_id)
+
+    async def claim_legacy(self, guild_id, defaults):
+        """Hand data from before guild scoping to guild_id
+
+        defaults (a GuildConfig built from the old SHOP_CHANNEL_ID,
+        POINTS_CHANNEL_ID and COMMAND_CHANNELS variables) fills in the channels
+        the guild hasn't configured itself.
+        """
+        moved = await self.db.transaction(claim_legacy_data, guild_id)
+        self.legacy_pending = False
+        log.info("Claimed data from before guild scoping", guild_id=guild_id, **moved)
+
+        await self.db.run(self._load)
+        config = self.get(guild_id)
+        if defaults.shop_channel_id and not config.shop_channel_id:
+            await self.set_channel(guild_id, "shop", defaults.shop_channel_id)
+        if defaults.points_channel_id and not config.points_channel_id:
+            await self.set_channel(guild_id, "points", defaults.points_channel_id)
+        if not config.command_channels:
+            for channel_id in defaults.command_channels:
+                await self.add_command_channel(guild_id, channel_id)
+        return moved
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import discord
+from aiohttp import web
+from utils import metrics
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+class HealthServer:
+    """Health, readiness and metrics endpoints served on the bot's own event loop
+
+    /health is liveness: it answers as long as the event loop is running, so a
+    wedged loop shows up as a probe timeout. /ready also requires a connected
+    gateway (every shard, when sharded), every extension loaded, the database
+    writer answering within READY_DB_TIMEOUT seconds and, for shard processes,
+    a live connection to the ledger process. /metrics renders the metrics registry.
+    """
+
+    def __init__(self, bot, extensions, host="0.0.0.0", port=None):
+        self.bot = bot
+        self.extensions = list(extensions)
+        self.host = host
+        self.port = int(port or os.getenv('PORT', '8000'))
+        self.db_timeout = float(os.getenv('READY_DB_TIMEOUT', '2'))
+        self.runner = None
+        self.db_check = None  # In-flight database check shared by concurrent probes
+
+        app = web.Application()
+        app.router.add_get('/', self.health)
+        app.router.add_get('/health', self.health)
+        app.router.add_get('/ready', self.ready)
+        app.router.add_get('/metrics', self.metrics)
+        self.app = app
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        log.info("Health check server started", port=self.port)
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def health(self, request):
+        return web.Response(text="Bot is running")
+
+    async def check_database(self):
+        """Share one database check between concurrent probes
+
+        A timed-out query still runs once the writer frees up, so starting a new
+        one per probe would pile work onto a writer that is already behind.
+        """
+        if self.db_check is None or self.db_check.done():
+            self.db_check = asyncio.create_task(self._check_database())
+        return await asyncio.shield(self.db_check)
+
+    async def _check_database(self):
+        """Run a trivial query on the writer connection, behind any queued writes"""
+        try:
+            await asyncio.wait_for(
+                self.bot.db.fetchone("SELECT 1 FROM users LIMIT 1", primary=True),
+                timeout=self.db_timeout
+            )
+            return None
+        except asyncio.TimeoutError:
+            return f"database did not answer within {self.db_timeout:g}s"
+        except Exception as e:
+            return f"database error: {e}"
+
+    def gateway_problem(self):
+        # is_ready() stays set across reconnects, so also check the websockets themselves
+        if self.bot.is_closed() or not self.bot.is_ready():
+            return "gateway not connected"
+        if isinstance(self.bot, discord.AutoShardedClient):
+            closed = [str(shard_id) for shard_id, shard in self.bot.shards.items() if shard.is_closed()]
+            if closed:
+                return f"shards not connected: {', '.join(closed)}"
+            return None
+        ws = self.bot.ws
+        if ws is None or not ws.open:
+            return "gateway not connected"
+        return None
+
+    async def ready(self, request):
+        problems = []
+        gateway_problem = self.gateway_problem()
+        if gateway_problem:
+            problems.append(gateway_problem)
+        if not getattr(self.bot.ledger, "connected", True):
+            problems.append("ledger process not connected")
+        missing = [ext for ext in self.extensions if ext not in self.bot.extensions]
+        if missing:
+            problems.append(f"extensions not loaded: {', '.join(missing)}")
+        db_problem = await self.check_database()
+        if db_problem:
+            problems.append(db_problem)
+
+        if problems:
+            return web.Response(status=503, text="Not ready: " + "; ".join(problems))
+        return web.Response(text="Ready")
+
+    async def metrics(self, request):
+        return web.Response(
+            body=metrics.registry.render().encode(),
+            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+        )
@@ -0,0 +1,159 @@
+import difflib
+import unicodedata
+
+# Suggestions offered when nothing matches as a prefix
+FUZZY_LIMIT = 5
+FUZZY_CUTOFF = 0.6
+
+def normalize(name):
+    """Case-folded name without emoji, symbols or punctuation: "🪼Furina" -> "furina" """
+    kept = "".join(char if unicodedata.category(char)[0] in "LN" else " " for char in name.casefold())
+    return " ".join(kept.split())
+
+def strip_emoji(name):
+    """Case-folded name with only emoji removed, "💎VIP" -> "vip" but "VIP+" stays "vip+"
+
+    Cn covers emoji newer than this Python's Unicode tables, like 🪼.
+    """
+    kept = "".join(
+        char for char in name.casefold()
+        if unicodedata.category(char) not in ("So", "Sk", "Cf", "Cn") and char not in "\ufe0e\ufe0f"
+    )
+    return " ".join(kept.split())
+
+def _is_wide(char):
+    return unicodedata.east_asian_width(char) in "WF"
+
+def word_starts(key):
+    """Positions a query may start matching at: each word, and each switch between CJK and other
+    characters, so "愛bleach" is found by "bleach" as well as by "愛"
+    """
+    return [
+        i for i, char in enumerate(key)
+        if char != " " and (i == 0 or key[i - 1] == " " or _is_wide(char) != _is_wide(key[i - 1]))
+    ]
+
+class PrefixTrie:
+    """Maps every prefix of the inserted keys to the values inserted under them
+
+    Each node keeps the full set of values below it, so a lookup is one step
+    per character of the prefix and never walks the subtree.
+    """
+
+    def __init__(self):
+        self.root = ({}, set())  # (children by character, values below this node)
+
+    def insert(self, key, value):
+        children, values = self.root
+        values.add(value)
+        for char in key:
+            node = children.get(char)
+            if node is None:
+                node = children[char] = ({}, set())
+            children, values = node
+            values.add(value)
+
+    def find(self, prefix):
+        children, values = self.root
+        for char in prefix:
+            node = children.get(char)
+            if node is None:
+                return set()
+            children, values = node
+        return values
+
+class Lookup:
+    """Result of resolving a name typed by an admin"""
+
+    def __init__(self, query, items, fuzzy=False):
+        self.query = query
+        self.items = items  # Candidates in shop order
+        self.fuzzy = fuzzy  # Only close spellings matched, offered as suggestions
+
+    @property
+    def item(self):
+        """The one item the query names, None if it matched nothing, several items or only fuzzily"""
+        if len(self.items) == 1 and not self.fuzzy:
+            return self.items[0]
+        return None
+
+    @property
+    def problem(self):
+        """Message explaining why there is no single item, None if there is one"""
+        if self.item is not None:
+            return None
+        # Ids are listed because they always resolve, even for names that normalize alike
+        listing = "\n".join(f"• {item[1]} (#{item[0]}, {item[2]:,} coins)" for item in self.items)
+        if not self.items:
+            return f"❌ No items found matching '{self.query}'."
+        if self.fuzzy:
+            return f"❌ No items found matching '{self.query}'. Did you mean:\n{listing}"
+        return f"Multiple items match '{self.query}'. Please be more specific:\n{listing}"
+
+class ItemIndex:
+    """Shop items by name and id, for resolving what admins type
+
+    The name exactly as stored wins, then the same name in any case, then the
+    name without its emoji, then an item id ("#12" or "12"), so every item has
+    at least one unambiguous name. After that names are matched without emoji,
+    case or punctuation: the whole name, then names with a word starting with
+    the query (prefix trie), then close spellings (difflib) as suggestions only.
+    """
+
+    def __init__(self, items):
+        self.order = {item[0]: position for position, item in enumerate(items)}
+        self.by_id = {item[0]: item for item in items}
+        self.by_raw = {}  # {name as stored: [item, ...]}, lists because names aren't unique
+        self.by_folded = {}  # {case-folded name: [item, ...]}
+        self.by_bare = {}  # {case-folded name without emoji: [item, ...]}
+        self.by_name = {}  # {normalized name: [item, ...]}
+        self.trie = PrefixTrie()
+        for item in items:
+            self.by_raw.setdefault(item[1], []).append(item)
+            self.by_folded.setdefault(item[1].casefold(), []).append(item)
+            self.by_bare.setdefault(strip_emoji(item[1]), []).append(item)
+            key = normalize(item[1])
+            self.by_name.setdefault(key, []).append(item)
+            for start in word_starts(key):
+                self.trie.insert(key[start:], item[0])
+
+    def _in_order(self, ids):
+        return [self.by_id[item_id] for item_id in sorted(ids, key=self.order.__getitem__)]
+
+    def prefix(self, query):
+        """Items with a word starting with the query, in shop order"""
+        return self._in_order(self.trie.find(normalize(query)))
+
+    def fuzzy(self, query):
+        close = difflib.get_close_matches(normalize(query), self.by_name, n=FUZZY_LIMIT, cutoff=FUZZY_CUTOFF)
+        return [item for key in close for item in self.by_name[key]]
+
+    def resolve(self, query, ids=True, exact=False):
+        """Find the items a query names
+
+        ids=False ignores item ids (for names from config files). exact=True
+        stops after the name and id tiers, looser matches are only suggested,
+        for commands that delete or move items.
+        """
+        query = query.strip()
+        for names, name in ((self.by_raw, query), (self.by_folded, query.casefold()), (self.by_bare, strip_emoji(query))):
+            if name in names:
+                return Lookup(query, names[name])
+        digits = query[1:] if query.startswith("#") else query
+        if ids and digits.isdecimal() and int(digits) in self.by_id:
+            return Lookup(query, [self.by_id[int(digits)]])
+        if exact:
+            return Lookup(query, self.resolve(query, ids).items, fuzzy=True)
+        key = normalize(query)
+        if not key:
+            return Lookup(query, [])
+        if key in self.by_name:
+            return Lookup(query, self.by_name[key])
+        items = self.prefix(key)
+        if items:
+            return Lookup(query, items)
+        return Lookup(query, self.fuzzy(key), fuzzy=True)
+
+    def complete(self, query, limit=25):
+        """Autocomplete candidates: prefix matches, else close spellings"""
+        return (self.prefix(query) or self.fuzzy(query))[:limit]
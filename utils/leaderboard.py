@@ -0,0 +1,114 @@
+import bisect
+import os
+from array import array
+import discord
+from discord.ext import commands, tasks
+from utils.embeds import create_leaderboard_embed, create_rank_embed
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+class LeaderboardSnapshot:
+    """Top-N list plus every balance in ascending order, for O(log n) rank lookups"""
+
+    def __init__(self, top, balances):
+        self.top = top  # [(user_id, balance), ...] highest first
+        self.balances = balances  # array('q') of all positive balances, ascending
+
+    def rank_of(self, balance):
+        """1-based rank a balance would have (ties share the best rank)"""
+        return len(self.balances) - bisect.bisect_right(self.balances, balance) + 1
+
+class Leaderboard(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.db = bot.db
+        self.guild_configs = bot.guild_configs
+        self.top_size = int(os.getenv('LEADERBOARD_SIZE', '100'))
+        self.page_size = 10
+        self.snapshots = {}  # {guild_id: LeaderboardSnapshot}, guilds without balances have none
+
+    async def cog_load(self):
+        await self.refresh()
+        self.refresh_snapshot.start()
+
+    def cog_unload(self):
+        self.refresh_snapshot.cancel()
+
+    def _load_snapshots(self, conn):
+        """Read every guild's balances and top-N (runs on a pooled read connection)
+
+        All queries walk idx_users_guild_balance in order, so none needs a sort:
+        one pass collects the balances of every guild, then each guild's top-N
+        is read from the end of its range of the index.
+        """
+        balances = {}
+        current_guild, current = None, None
+        for guild_id, balance in conn.execute(
+            "SELECT guild_id, balance FROM users WHERE balance > 0 ORDER BY guild_id, balance"
+        ):
+            if guild_id != current_guild:
+                current_guild, current = guild_id, balances.setdefault(guild_id, array('q'))
+            current.append(balance)
+
+        snapshots = {}
+        for guild_id, guild_balances in balances.items():
+            top = conn.execute(
+                "SELECT user_id, balance FROM users WHERE guild_id = ? AND balance > 0 ORDER BY balance DESC LIMIT ?",
+                (guild_id, self.top_size)
+            ).fetchall()
+            snapshots[guild_id] = LeaderboardSnapshot(top, guild_balances)
+        return snapshots
+
+    def snapshot_for(self, guild_id):
+        """The guild's snapshot, empty until someone there has a balance"""
+        return self.snapshots.get(guild_id) or LeaderboardSnapshot([], array('q'))
+
+    async def refresh(self):
+        """Rebuild the snapshots, flushing buffered earnings first so they are current"""
+        await self.bot.ledger.flush()
+        self.snapshots = await self.db.run_read(self._load_snapshots)
+
+    @tasks.loop(minutes=1)
+    async def refresh_snapshot(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            log.error("Error refreshing snapshot", error=e)
+
+    @refresh_snapshot.before_loop
+    async def before_refresh_snapshot(self):
+        await self.bot.wait_until_ready()
+
+    @commands.command(name="leaderboard", aliases=["lb"])
+    async def leaderboard(self, ctx, page: int = 1):
+        """Show the richest users, served from the in-memory snapshot"""
+        if not self.guild_configs.get(ctx.guild.id).allows_commands(ctx.channel.id):
+            return await ctx.send("❌ This command can only be used in designated command channels.")
+
+        top = self.snapshot_for(ctx.guild.id).top
+        total_pages = max(1, (len(top) + self.page_size - 1) // self.page_size)
+        page = min(max(page, 1), total_pages)
+        start = (page - 1) * self.page_size
+
+        embed = create_leaderboard_embed(top[start:start + self.page_size], page, total_pages, start + 1)
+        await ctx.send(embed=embed)
+
+    @commands.command(name="rank")
+    async def rank(self, ctx, member: discord.Member = None):
+        """Show your (or another member's) rank"""
+        if not self.guild_configs.get(ctx.guild.id).allows_commands(ctx.channel.id):
+            return await ctx.send("❌ This command can only be used in designated command channels.")
+
+        member = member or ctx.author
+        balance = await self.bot.ledger.get_balance(ctx.guild.id, member.id)
+        if balance <= 0:
+            return await ctx.send(f"{member.mention} hasn't earned any coins yet, so they don't have a rank.")
+
+        snapshot = self.snapshot_for(ctx.guild.id)
+        total_users = max(len(snapshot.balances), snapshot.rank_of(balance))
+        embed = create_rank_embed(member, snapshot.rank_of(balance), total_users, balance)
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(Leaderboard(bot))
@@ -0,0 +1,270 @@
+import os
+import sqlite3
+import threading
+from utils.accrual import AccrualBuffer
+from utils.cache import LRUCache
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+class Ledger:
+    """Owns every balance read and write
+
+    Balances are made of three parts: the committed value in the users table,
+    coins that have been handed to the database writer but not applied yet
+    (in flight), and coins still sitting in the AccrualBuffer. The LRU cache
+    mirrors the committed value and is only updated on the database writer
+    thread, after each transaction commits, so it can never get ahead of or
+    behind the database. Reads add the unwritten coins on top.
+
+    Every balance belongs to an account, a (guild_id, user_id) pair, so each
+    guild has its own economy.
+    """
+
+    CREDIT_SQL = '''INSERT INTO users (guild_id, user_id, balance) VALUES (?, ?, ?)
+                    ON CONFLICT(guild_id, user_id) DO UPDATE SET balance = balance + excluded.balance
+                    RETURNING balance'''
+    SET_SQL = '''INSERT INTO users (guild_id, user_id, balance) VALUES (?, ?, ?)
+                 ON CONFLICT(guild_id, user_id) DO UPDATE SET balance = excluded.balance
+                 RETURNING balance'''
+    DEBIT_SQL = '''UPDATE users SET balance = balance - ?
+                   WHERE guild_id = ? AND user_id = ? AND balance >= ? RETURNING balance'''
+    DEBIT_FLOOR_SQL = '''UPDATE users SET balance = MAX(0, balance - ?)
+                         WHERE guild_id = ? AND user_id = ? RETURNING balance'''
+    ACCRUE_SQL = '''INSERT INTO users (guild_id, user_id, balance) VALUES (?, ?, ?)
+                    ON CONFLICT(guild_id, user_id) DO UPDATE SET balance = balance + excluded.balance'''
+
+    def __init__(self, db, buffer, cache_size=10000):
+        self.db = db
+        self.buffer = buffer
+        self.cache = LRUCache(cache_size)  # {(guild_id, user_id): committed balance}
+        self.lock = threading.Lock()  # Guards cache and in_flight across the loop and writer threads
+        self.in_flight = {}  # {account: coins submitted to the writer but not yet committed}
+        self.staged = {}  # Balances written by the current transaction (writer thread only)
+        self.staged_deltas = {}  # Coins added by batched credits in the current transaction
+
+    def _unwritten(self, account):
+        """Coins that are not in the committed balance yet (call with the lock held)"""
+        return self.in_flight.get(account, 0) + self.buffer.pending_for(account)
+
+    def _effective(self, account, committed):
+        with self.lock:
+            return self.cache.peek(account, committed) + self._unwritten(account)
+
+    # ----- Reads -----
+
+    async def get_balance(self, guild_id, user_id):
+        """Current balance, served from memory for cached accounts"""
+        account = (guild_id, user_id)
+        with self.lock:
+            committed = self.cache.get(account)
+            if committed is not None:
+                return committed + self._unwritten(account)
+
+        committed = await self.db.run(self._load, account)
+        return self._effective(account, committed)
+
+    def _load(self, account):
+        row = self.db.conn.execute(
+            "SELECT balance FROM users WHERE guild_id = ? AND user_id = ?", account
+        ).fetchone()
+        committed = row[0] if row else 0
+        with self.lock:
+            self.cache.set(account, committed)
+        return committed
+
+    # ----- Message accrual -----
+
+    def accrue(self, guild_id, user_id, amount):
+        """Buffer message earnings, returns True if a flush is due"""
+        return self.buffer.add((guild_id, user_id), amount)
+
+    def flush_due(self):
+        """True once buffered earnings are old enough to write"""
+        return self.buffer.should_flush()
+
+    async def flush(self):
+        """Write all buffered earnings as a single upsert transaction"""
+        if not self.buffer.pending:
+            return 0
+        batch = self._take_batch()
+        try:
+            await self.db.run(self._write_accruals, batch)
+        except sqlite3.Error as e:
+            self._restore_batch(batch)
+            log.error("Error flushing balances", accounts=len(batch), error=e)
+            return 0
+        self.buffer.record_flush(len(batch))
+        return len(batch)
+
+    def flush_sync(self):
+        """Blocking flush for use once the event loop has stopped (shutdown)"""
+        if not self.buffer.pending:
+            return 0
+        batch = self._take_batch()
+        try:
+            self.db.call(self._write_accruals, batch)
+        except sqlite3.Error as e:
+            self._restore_batch(batch)
+            log.error("Error flushing balances", accounts=len(batch), error=e)
+            return 0
+        self.buffer.record_flush(len(batch))
+        return len(batch)
+
+    def _take_batch(self):
+        batch = self.buffer.take_batch()
+        with self.lock:
+            for account, amount in batch:
+                self.in_flight[account] = self.in_flight.get(account, 0) + amount
+        return batch
+
+    def _restore_batch(self, batch):
+        with self.lock:
+            self._release_in_flight(batch)
+        self.buffer.restore_batch(batch)
+
+    def _release_in_flight(self, batch):
+        for account, amount in batch:
+            remaining = self.in_flight.get(account, 0) - amount
+            if remaining:
+                self.in_flight[account] = remaining
+            else:
+                self.in_flight.pop(account, None)
+
+    def _write_accruals(self, batch):
+        with self.db.conn:
+            self.db.conn.executemany(
+                self.ACCRUE_SQL, [(guild_id, user_id, amount) for (guild_id, user_id), amount in batch]
+            )
+        # Committed: move the coins from in flight into the cached balances in one step
+        with self.lock:
+            for account, amount in batch:
+                committed = self.cache.peek(account)
+                if committed is not None:
+                    self.cache.update_if_present(account, committed + amount)
+            self._release_in_flight(batch)
+
+    # ----- Transactions -----
+
+    async def transaction(self, func, *args):
+        """Run func(conn, ledger, *args) in one transaction on the writer
+
+        Balances changed through the apply_* helpers inside func are written to
+        the cache once the transaction commits, and discarded if it fails.
+        Mark func with @remote_callable so sharded bots can run it too.
+        """
+        return await self.db.run(self._run_transaction, func, self, *args)
+
+    def _run_transaction(self, func, *args):
+        self.staged = {}
+        self.staged_deltas = {}
+        try:
+            with self.db.conn:
+                result = func(self.db.conn, *args)
+            with self.lock:
+                for account, committed in self.staged.items():
+                    self.cache.set(account, committed)
+                for account, amount in self.staged_deltas.items():
+                    committed = self.cache.peek(account)
+                    if committed is not None:
+                        self.cache.update_if_present(account, committed + amount)
+            return result
+        finally:
+            self.staged = {}
+            self.staged_deltas = {}
+
+    def _stage(self, account, committed):
+        """Remember a balance read back from the database (it already includes earlier deltas)"""
+        self.staged[account] = committed
+        self.staged_deltas.pop(account, None)
+
+    def apply_credit(self, conn, guild_id, user_id, amount):
+        """Add coins (negative to subtract) inside a transaction, returns the committed balance"""
+        committed = conn.execute(self.CREDIT_SQL, (guild_id, user_id, amount)).fetchone()[0]
+        self._stage((guild_id, user_id), committed)
+        return committed
+
+    def apply_credits(self, conn, credits):
+        """Add coins to many accounts with one executemany inside a transaction
+
+        credits is [(guild_id, user_id, amount), ...].
+        """
+        conn.executemany(self.ACCRUE_SQL, credits)
+        for guild_id, user_id, amount in credits:
+            account = (guild_id, user_id)
+            if account in self.staged:
+                self.staged[account] += amount
+            else:
+                self.staged_deltas[account] = self.staged_deltas.get(account, 0) + amount
+
+    def apply_set(self, conn, guild_id, user_id, amount):
+        """Set a balance inside a transaction"""
+        committed = conn.execute(self.SET_SQL, (guild_id, user_id, amount)).fetchone()[0]
+        self._stage((guild_id, user_id), committed)
+        return committed
+
+    def apply_debit(self, conn, guild_id, user_id, amount):
+        """Remove coins only if the committed balance covers them, returns None otherwise"""
+        row = conn.execute(self.DEBIT_SQL, (amount, guild_id, user_id, amount)).fetchone()
+        if not row:
+            return None
+        self._stage((guild_id, user_id), row[0])
+        return row[0]
+
+    def apply_debit_floor(self, conn, guild_id, user_id, amount):
+        """Remove coins without going below zero, returns None if the account has no row"""
+        row = conn.execute(self.DEBIT_FLOOR_SQL, (amount, guild_id, user_id)).fetchone()
+        if not row:
+            return None
+        self._stage((guild_id, user_id), row[0])
+        return row[0]
+
+    # ----- Single-statement writes -----
+
+    async def credit(self, guild_id, user_id, amount):
+        """Add coins to an account, returns the new balance"""
+        committed = await self.db.run(self._run_transaction, self.apply_credit, guild_id, user_id, amount)
+        return self._effective((guild_id, user_id), committed)
+
+    async def set_balance(self, guild_id, user_id, amount):
+        """Set an account's committed balance, returns the new balance
+
+        Buffered earnings are written first, otherwise the next flush would add
+        them on top of the new balance.
+        """
+        await self.flush()
+        committed = await self.db.run(self._run_transaction, self.apply_set, guild_id, user_id, amount)
+        return self._effective((guild_id, user_id), committed)
+
+    async def debit_floor(self, guild_id, user_id, amount):
+        """Remove coins without going below zero, returns None if the account has no row
+
+        Buffered earnings are written first, so the floor applies to all of the
+        user's coins and an account whose coins are all still buffered has a row.
+        """
+        await self.flush()
+        committed = await self.db.run(self._run_transaction, self.apply_debit_floor, guild_id, user_id, amount)
+        if committed is None:
+            return None
+        return self._effective((guild_id, user_id), committed)
+
+    def stats(self):
+        """Cache and buffer counters for monitoring"""
+        with self.lock:
+            stats = self.cache.stats()
+            stats["in_flight_accounts"] = len(self.in_flight)
+        stats["pending_accounts"] = len(self.buffer.pending)
+        stats["total_flushes"] = self.buffer.total_flushes
+        stats["total_rows_written"] = self.buffer.total_rows_written
+        return stats
+
+def create_ledger(db):
+    """Ledger with buffer and cache sizes from environment variables"""
+    return Ledger(
+        db,
+        AccrualBuffer(
+            max_pending=int(os.getenv('ACCRUAL_MAX_PENDING', '500')),
+            max_age=float(os.getenv('ACCRUAL_MAX_AGE', '5'))
+        ),
+        cache_size=int(os.getenv('BALANCE_CACHE_SIZE', '10000'))
+    )
@@ -0,0 +1,236 @@
+import asyncio
+import itertools
+import pickle
+import socket
+import struct
+from utils.database import Database, remote_name
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+# Frames are a 4-byte big-endian length followed by a pickle. Requests are
+# (request_id, op, args), replies (request_id, ok, value). Request id 0 is
+# fire-and-forget and gets no reply. The socket is only reachable by the
+# user running the bot, the same trust boundary as the database file.
+HEADER = struct.Struct(">I")
+
+def encode_frame(message):
+    body = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    return HEADER.pack(len(body)) + body
+
+async def read_frame(reader):
+    """Next message from a stream, None at EOF"""
+    try:
+        header = await reader.readexactly(HEADER.size)
+        return pickle.loads(await reader.readexactly(HEADER.unpack(header)[0]))
+    except asyncio.IncompleteReadError:
+        return None
+
+def _recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("ledger process closed the connection")
+        data += chunk
+    return bytes(data)
+
+class LedgerClient:
+    """Connection from a shard process to the ledger process (utils.ledger_server)
+
+    Message earnings are coalesced in memory and sent once per event loop
+    iteration as a single fire-and-forget frame. Every request first sends the
+    earnings still waiting, so the ledger process always sees them before
+    anything that reads or spends the same balance.
+    """
+
+    def __init__(self, path, timeout=30, retry_delay=1):
+        self.path = path
+        self.timeout = timeout  # Seconds a request may wait for its reply
+        self.retry_delay = retry_delay
+        self.reader = None
+        self.writer = None
+        self.ids = itertools.count(1)
+        self.waiting = {}  # {request_id: Future}
+        self.accruals = {}  # {account: coins not sent yet}
+        self.send_scheduled = False
+        self.connected_event = asyncio.Event()
+        self.run_task = None
+
+    @property
+    def connected(self):
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def start(self):
+        """Connect, then keep reconnecting in the background if the connection drops
+
+        The background task runs until the event loop shuts down.
+        """
+        self.run_task = asyncio.create_task(self._run())
+        await self.wait_connected()
+
+    async def wait_connected(self):
+        await asyncio.wait_for(self.connected_event.wait(), timeout=self.timeout)
+
+    async def _run(self):
+        delay = self.retry_delay
+        while True:
+            try:
+                self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+            except OSError as e:
+                log.warning("Can't reach the ledger process", path=self.path, error=e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 1.5, 30)
+                continue
+
+            delay = self.retry_delay
+            log.info("Connected to the ledger process", path=self.path)
+            self.connected_event.set()
+            self._send_accruals()
+            try:
+                await self._read_replies()
+            finally:
+                self.connected_event.clear()
+                self.writer.close()
+                self.writer = None
+                error = ConnectionError("connection to the ledger process was lost")
+                for future in self.waiting.values():
+                    if not future.done():
+                        future.set_exception(error)
+                self.waiting.clear()
+            log.error("Lost connection to the ledger process, reconnecting", path=self.path)
+
+    async def _read_replies(self):
+        while True:
+            message = await read_frame(self.reader)
+            if message is None:
+                return
+            request_id, ok, value = message
+            future = self.waiting.pop(request_id, None)
+            if future is None or future.done():
+                continue  # The caller timed out
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    # ----- Requests -----
+
+    def accrue(self, account, amount):
+        """Queue message earnings for the next accrual frame"""
+        self.accruals[account] = self.accruals.get(account, 0) + amount
+        if not self.send_scheduled:
+            self.send_scheduled = True
+            asyncio.get_running_loop().call_soon(self._send_accruals)
+
+    def _send_accruals(self):
+        self.send_scheduled = False
+        if not self.accruals or not self.connected:
+            return  # Kept until the connection is back
+        self.writer.write(encode_frame((0, "accrue", (list(self.accruals.items()),))))
+        self.accruals = {}
+
+    async def request(self, op, *args):
+        """Send a request and wait for its reply, re-raising the ledger process's exception"""
+        if not self.connected:
+            await self.wait_connected()
+        self._send_accruals()
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request_id] = future
+        try:
+            self.writer.write(encode_frame((request_id, op, args)))
+            await self.writer.drain()
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        finally:
+            self.waiting.pop(request_id, None)
+
+    def request_sync(self, op, *args):
+        """Blocking request over a new connection, for shutdown once the event loop has stopped"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            if self.accruals:
+                sock.sendall(encode_frame((0, "accrue", (list(self.accruals.items()),))))
+                self.accruals = {}
+            sock.sendall(encode_frame((1, op, args)))
+            size = HEADER.unpack(_recv_exactly(sock, HEADER.size))[0]
+            _, ok, value = pickle.loads(_recv_exactly(sock, size))
+        if not ok:
+            raise value
+        return value
+
+class RemoteLedger:
+    """Ledger interface for shard processes, every call is served by the ledger process
+
+    Transaction functions are sent by name, so they must be module-level
+    functions marked with @remote_callable.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @property
+    def connected(self):
+        return self.client.connected
+
+    async def get_balance(self, guild_id, user_id):
+        return await self.client.request("get_balance", guild_id, user_id)
+
+    def accrue(self, guild_id, user_id, amount):
+        """Queue message earnings, the ledger process decides when to flush"""
+        self.client.accrue((guild_id, user_id), amount)
+        return False
+
+    def flush_due(self):
+        return False
+
+    async def flush(self):
+        return await self.client.request("flush")
+
+    def flush_sync(self):
+        try:
+            return self.client.request_sync("flush")
+        except OSError as e:
+            log.error("Error flushing balances", accounts=len(self.client.accruals), error=e)
+            return 0
+
+    async def transaction(self, func, *args):
+        return await self.client.request("transaction", remote_name(func), args)
+
+    async def credit(self, guild_id, user_id, amount):
+        return await self.client.request("credit", guild_id, user_id, amount)
+
+    async def set_balance(self, guild_id, user_id, amount):
+        # Our queued earnings go out ahead of the request, and the ledger process flushes before writing
+        return await self.client.request("set_balance", guild_id, user_id, amount)
+
+    async def debit_floor(self, guild_id, user_id, amount):
+        # Same ordering as set_balance, buffered coins are committed before the floor is applied
+        return await self.client.request("debit_floor", guild_id, user_id, amount)
+
+    def stats(self):
+        return {"pending_accounts": len(self.client.accruals), "connected": int(self.client.connected)}
+
+class RemoteDatabase(Database):
+    """Database for shard processes: reads stay local, writes go to the ledger process
+
+    Reads use this process's own read-only connections, which WAL mode keeps
+    consistent with the single writer in the ledger process. A write returns
+    once the ledger process has committed it, so reads issued afterwards see it.
+    """
+
+    read_only = True
+
+    def __init__(self, client, config=None, **kwargs):
+        self.client = client
+        super().__init__(config, **kwargs)
+
+    async def execute(self, sql, params=()):
+        return await self.client.request("execute", sql, tuple(params))
+
+    async def executemany(self, sql, seq_of_params):
+        return await self.client.request("executemany", sql, [tuple(params) for params in seq_of_params])
+
+    async def transaction(self, func, *args):
+        return await self.client.request("db_transaction", remote_name(func), args)
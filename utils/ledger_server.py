@@ -0,0 +1,161 @@
+"""Ledger process for sharded deployments
+
+Owns the only writable SQLite connection and the Ledger (balance cache and
+accrual buffer), and serves the bot processes started by utils.shard_runner
+over a Unix socket. Run from the repository root:
+
+    LEDGER_SOCKET=/tmp/bitbuddy-ledger.sock python -m utils.ledger_server
+"""
+import asyncio
+import os
+import pickle
+import signal
+from utils.database import Database, DatabaseConfig, resolve_remote
+from utils.ledger import create_ledger
+from utils.ledger_client import encode_frame, read_frame
+from utils.migrations import migrate
+from utils.log import get_logger, setup_logging
+
+log = get_logger("ledger_server")
+
+DEFAULT_SOCKET = "/tmp/bitbuddy-ledger.sock"
+
+class LedgerServer:
+    """Serves Ledger and Database writes to bot processes, one writer for every shard"""
+
+    def __init__(self, db, ledger, path):
+        self.db = db
+        self.ledger = ledger
+        self.path = path
+        self.server = None
+        self.clients = set()
+        self.tasks = set()  # Requests being served, kept referenced until they finish
+        self.ops = {
+            "get_balance": ledger.get_balance,
+            "credit": ledger.credit,
+            "set_balance": ledger.set_balance,
+            "debit_floor": ledger.debit_floor,
+            "flush": ledger.flush,
+            "transaction": self.transaction,
+            "db_transaction": self.db_transaction,
+            "execute": db.execute,
+            "executemany": db.executemany,
+            "stats": self.stats,
+        }
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Left behind by a process that didn't shut down cleanly
+        self.server = await asyncio.start_unix_server(self.handle_client, self.path)
+        os.chmod(self.path, 0o600)
+        log.info("Ledger process listening", path=self.path)
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            for writer in list(self.clients):
+                writer.close()
+            await self.server.wait_closed()
+            self.server = None
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def handle_client(self, reader, writer):
+        self.clients.add(writer)
+        log.info("Bot process connected", clients=len(self.clients))
+        try:
+            while True:
+                message = await read_frame(reader)
+                if message is None:
+                    break
+                request_id, op, args = message
+                if op == "accrue":
+                    # Applied in arrival order, before any request sent after it
+                    self.accrue(*args)
+                    continue
+                task = asyncio.create_task(self.serve(writer, request_id, op, args))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+        except (ConnectionError, pickle.UnpicklingError) as e:
+            log.warning("Dropped bot process connection", error=e)
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+            log.info("Bot process disconnected", clients=len(self.clients))
+
+    def accrue(self, batch):
+        flush_due = False
+        for (guild_id, user_id), amount in batch:
+            flush_due = self.ledger.accrue(guild_id, user_id, amount) or flush_due
+        if flush_due:
+            self._spawn(self.ledger.flush())
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def serve(self, writer, request_id, op, args):
+        try:
+            reply = (request_id, True, await self.ops[op](*args))
+        except Exception as e:
+            if not isinstance(e, LookupError):
+                log.exception("Ledger request failed", op=op)
+            reply = (request_id, False, e)
+        if writer.is_closing():
+            return
+        try:
+            frame = encode_frame(reply)
+        except Exception as e:  # The exception (or result) didn't pickle
+            frame = encode_frame((request_id, False, RuntimeError(f"{op} failed: {e!r}")))
+        writer.write(frame)
+
+    async def transaction(self, name, args):
+        return await self.ledger.transaction(resolve_remote(name), *args)
+
+    async def db_transaction(self, name, args):
+        return await self.db.transaction(resolve_remote(name), *args)
+
+    async def stats(self):
+        return self.ledger.stats()
+
+async def flush_loop(ledger):
+    """Flush buffered earnings once they reach the age threshold"""
+    while True:
+        await asyncio.sleep(1)
+        if ledger.flush_due():
+            await ledger.flush()
+
+async def serve(path):
+    db = Database(DatabaseConfig())
+    applied = db.call(migrate, db.conn)
+    log.info("Database schema up to date", applied=len(applied))
+    ledger = create_ledger(db)
+    server = LedgerServer(db, ledger, path)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    await server.start()
+    flusher = asyncio.create_task(flush_loop(ledger))
+    try:
+        await stop.wait()
+    finally:
+        log.info("Ledger process stopping", clients=len(server.clients))
+        flusher.cancel()
+        await server.stop()
+        flushed = await ledger.flush()
+        log.info("Flushed pending balances", users=flushed)
+        db.close()
+        log.info("Database connection closed")
+
+def main():
+    setup_logging()
+    asyncio.run(serve(os.getenv('LEDGER_SOCKET', DEFAULT_SOCKET)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+# Keyword arguments the logging module handles itself; everything else becomes a field
+_RESERVED = {"exc_info", "stack_info", "stacklevel", "extra"}
+
+class StructuredLogger(logging.LoggerAdapter):
+    """Logger that takes key/value fields as keyword arguments
+
+        log = get_logger(__name__)
+        log.info("purchase completed", user_id=user.id, item=item_name, price=price)
+
+    Fields end up on the record as record.fields, and are only collected when
+    the level is enabled, so disabled debug calls cost a single level check.
+    """
+
+    def __init__(self, logger):
+        super().__init__(logger, {})
+
+    def process(self, msg, kwargs):
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in _RESERVED}
+        if fields:
+            kwargs["extra"] = {**kwargs.get("extra", {}), "fields": fields}
+        return msg, kwargs
+
+def get_logger(name):
+    return StructuredLogger(logging.getLogger(name))
+
+def _format_value(value):
+    text = str(value)
+    if not text or any(char in text for char in ' "=\n'):
+        return json.dumps(text, ensure_ascii=False)
+    return text
+
+class KeyValueFormatter(logging.Formatter):
+    """time level logger message key=value ... (values with spaces are quoted)"""
+
+    def format(self, record):
+        line = (
+            f"{self.formatTime(record)} {record.levelname:<7} {record.name} "
+            f"{record.getMessage()}"
+        )
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={_format_value(value)}" for key, value in fields.items())
+        exc_text = self.exception_text(record)
+        if exc_text:
+            line += "\n" + exc_text
+        if record.stack_info:
+            line += "\n" + self.formatStack(record.stack_info)
+        return line
+
+    def exception_text(self, record):
+        # Records from the queue carry exc_text only, see _QueueHandler.prepare
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        return record.exc_text
+
+    def formatTime(self, record, datefmt=None):
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z"
+
+class JsonFormatter(KeyValueFormatter):
+    """One JSON object per line, for log pipelines that parse records"""
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update(getattr(record, "fields", None) or {})
+        exc_text = self.exception_text(record)
+        if exc_text:
+            data["exception"] = exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread
+
+    The stock prepare() formats every record on the calling thread. Here only
+    the message arguments and exception text are resolved (they may reference
+    objects that change later); the rest happens off the event loop.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_listener = None
+
+def setup_logging(level=None, stream=None):
+    """Route every logger through a queue to one background writer thread
+
+    LOG_LEVEL (default INFO) sets the level, LOG_FORMAT=json switches to JSON
+    lines. discord.py's own loggers are kept at INFO or above, since their
+    debug output logs every gateway event.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    formatter = JsonFormatter() if os.getenv('LOG_FORMAT', 'text').lower() == 'json' else KeyValueFormatter()
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers[:] = [_QueueHandler(log_queue)]
+    root.setLevel(level)
+    logging.getLogger('discord').setLevel(max(logging.INFO, root.level))
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
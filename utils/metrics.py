@@ -0,0 +1,232 @@
+import bisect
+import re
+import threading
+import time
+
+# Default latency buckets in seconds, from 1ms to 10s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if value != value:
+        return "NaN"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Base class for a metric family with optional labels
+
+    Metrics are updated from the event loop and the database threads, so every
+    update takes the metric's lock.
+    """
+    type_name = "untyped"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        # Label values are stringified at render time, keeping updates cheap on hot paths
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {labels}")
+        return labels
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            items = list(self.values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+class Gauge(Metric):
+    """Value that can go up and down, or that is read from a callback at scrape time"""
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labels=(), callback=None):
+        super().__init__(name, documentation, labels)
+        self.values = {}
+        self.callback = callback  # Returns a number, or {label_values_tuple: number} for labelled gauges
+
+    def set(self, value, *labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def samples(self):
+        if self.callback is not None:
+            try:
+                value = self.callback()
+            except Exception:
+                return
+            items = value.items() if isinstance(value, dict) else [((), value)]
+        else:
+            with self.lock:
+                items = list(self.values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+class Histogram(Metric):
+    """Bucketed distribution of observations (latencies, sizes...)"""
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # {labels: [bucket counts..., sum, count]}
+
+    def observe(self, value, *labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def time(self, *labels):
+        """Context manager that observes the duration of the block"""
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self.lock:
+            items = [(key, list(state)) for key, state in self.values.items()]
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, ("le", _format_value(float(bound))))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {_format_value(state[-2])}"
+            yield f"{self.name}_count{labels} {state[-1]}"
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+class MetricsRegistry:
+    """Holds every metric and renders them in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=(), callback=None):
+        return self._register(Gauge(name, documentation, labels, callback))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+# Shared registry, modules register their metrics on import
+registry = MetricsRegistry()
+
+db_query_seconds = registry.histogram(
+    "bitbuddy_db_query_seconds", "Time spent executing database work on a worker thread", ("query",)
+)
+db_query_errors = registry.counter(
+    "bitbuddy_db_query_errors_total", "Database work that raised an error", ("query",)
+)
+command_seconds = registry.histogram(
+    "bitbuddy_command_seconds", "Command handler latency", ("command", "status")
+)
+messages_total = registry.counter(
+    "bitbuddy_messages_total", "Messages seen by on_message", ("kind",)
+)
+message_handler_seconds = registry.histogram(
+    "bitbuddy_message_handler_seconds", "on_message handler latency"
+)
+discord_request_seconds = registry.histogram(
+    "bitbuddy_discord_request_seconds", "Outbound Discord REST call latency", ("method", "route", "status")
+)
+
+_SQL_TARGET = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE(?: IF NOT EXISTS)?|INDEX(?: IF NOT EXISTS)?\s+\w+\s+ON)\s+(\w+)", re.IGNORECASE)
+_query_types = {}
+
+def query_type(sql):
+    """Short, low-cardinality label for a SQL statement, e.g. "select users" """
+    label = _query_types.get(sql)
+    if label is None:
+        verb = sql.split(None, 1)[0].lower() if sql.strip() else "unknown"
+        match = _SQL_TARGET.search(sql)
+        label = f"{verb} {match.group(1).lower()}" if match else verb
+        if len(_query_types) < 1000:  # Statements are static strings, but never grow without bound
+            _query_types[sql] = label
+    return label
+
+def instrument_http(http):
+    """Time every REST request discord.py makes through this HTTPClient"""
+    original = http.request
+
+    async def request(route, **kwargs):
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            return await original(route, **kwargs)
+        except Exception as e:
+            status = getattr(e, "status", None) or type(e).__name__
+            raise
+        finally:
+            discord_request_seconds.observe(time.perf_counter() - start, route.method, route.path, status)
+
+    http.request = request
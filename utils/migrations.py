@@ -0,0 +1,202 @@
+import datetime
+import time
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+# Guild id that data from before guild scoping is stored under until its guild claims it
+LEGACY_GUILD = 0
+
+# Sample items the shop starts with on a fresh database
+SAMPLE_ITEMS = [
+    ("🪼Furina", 50000, 1361011749913890816),
+    ("🌟Navia", 50000, 1361012791791845477),
+    ("🌸Raiden Shogun", 50000, 1361013400758386868),
+    ("☠One Piece", 50000, 1361014183927349468),
+    ("🦊Naruto", 50000, 1361014693459656805),
+    ("愛Bleach", 50000, 1361014463943147721),
+    ("💎VIP", 100000, 1361014938155483298)
+]
+
+def initial_schema(conn):
+    """Tables the bot has always used, plus the sample shop items on a fresh database
+
+    Uses IF NOT EXISTS throughout, so databases created before versioning
+    (by main.py, the cogs or db_monitor --reset) pass through unchanged.
+    """
+    conn.execute('''CREATE TABLE IF NOT EXISTS users (user_id INTEGER PRIMARY KEY, balance INTEGER)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS shop_items (
+                id INTEGER PRIMARY KEY,
+                name TEXT,
+                price INTEGER,
+                role_id INTEGER)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS admin_roles (role_id INTEGER PRIMARY KEY)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS daily_rewards
+                (user_id INTEGER PRIMARY KEY,
+                last_claim TIMESTAMP,
+                streak INTEGER DEFAULT 0)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS purchases
+                (token TEXT PRIMARY KEY,
+                user_id INTEGER,
+                item_id INTEGER,
+                price INTEGER,
+                status TEXT,
+                created_at INTEGER)''')
+
+    if conn.execute("SELECT COUNT(*) FROM shop_items").fetchone()[0] == 0:
+        conn.executemany("INSERT INTO shop_items (name, price, role_id) VALUES (?, ?, ?)", SAMPLE_ITEMS)
+        log.info("Initialized shop items", count=len(SAMPLE_ITEMS))
+
+def lookup_indexes(conn):
+    """Indexes for the hot lookups: leaderboard order and item names"""
+    # Leaderboard and rank snapshots read balances in order
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_users_balance ON users(balance)''')
+    # !updateprice and !admin removeitem look items up by exact name
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_shop_items_name ON shop_items(name)''')
+
+def _to_epoch(value):
+    """Old last_claim values were naive local-time ISO strings"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(datetime.datetime.fromisoformat(value).timestamp())
+    except (TypeError, ValueError):
+        return 0  # Unreadable claims count as never claimed
+
+def epoch_last_claim(conn):
+    """Store daily_rewards.last_claim as integer epoch seconds, indexed
+
+    SQLite can't change a column type in place, so the table is rebuilt and
+    every existing ISO timestamp is converted once here instead of being
+    parsed on every eligibility check.
+    """
+    rows = conn.execute("SELECT user_id, last_claim, streak FROM daily_rewards").fetchall()
+    conn.execute("DROP TABLE daily_rewards")
+    conn.execute('''CREATE TABLE daily_rewards
+                (user_id INTEGER PRIMARY KEY,
+                last_claim INTEGER NOT NULL DEFAULT 0,
+                streak INTEGER NOT NULL DEFAULT 0)''')
+    conn.executemany(
+        "INSERT INTO daily_rewards (user_id, last_claim, streak) VALUES (?, ?, ?)",
+        ((user_id, _to_epoch(last_claim), streak or 0) for user_id, last_claim, streak in rows)
+    )
+    conn.execute('''CREATE INDEX idx_daily_rewards_last_claim ON daily_rewards(last_claim)''')
+    if rows:
+        log.info("Converted daily reward claims to epoch seconds", rows=len(rows))
+
+def guild_scoped_tables(conn):
+    """Key balances, streaks, shop items and admin roles by guild, and add channel config tables
+
+    Existing rows are kept under LEGACY_GUILD; utils.guild_config.claim_legacy_data
+    moves them to the guild they belong to once the bot knows it.
+    """
+    conn.execute('''CREATE TABLE users_new
+                (guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                balance INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, user_id))''')
+    conn.execute("INSERT INTO users_new (guild_id, user_id, balance) SELECT ?, user_id, COALESCE(balance, 0) FROM users", (LEGACY_GUILD,))
+
+    conn.execute('''CREATE TABLE daily_rewards_new
+                (guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                last_claim INTEGER NOT NULL DEFAULT 0,
+                streak INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, user_id))''')
+    conn.execute(
+        "INSERT INTO daily_rewards_new (guild_id, user_id, last_claim, streak) SELECT ?, user_id, last_claim, streak FROM daily_rewards",
+        (LEGACY_GUILD,)
+    )
+
+    conn.execute('''CREATE TABLE shop_items_new
+                (id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                name TEXT,
+                price INTEGER,
+                role_id INTEGER)''')
+    conn.execute(
+        "INSERT INTO shop_items_new (id, guild_id, name, price, role_id) SELECT id, ?, name, price, role_id FROM shop_items",
+        (LEGACY_GUILD,)
+    )
+
+    conn.execute('''CREATE TABLE admin_roles_new
+                (guild_id INTEGER NOT NULL,
+                role_id INTEGER NOT NULL,
+                PRIMARY KEY (guild_id, role_id))''')
+    conn.execute("INSERT INTO admin_roles_new (guild_id, role_id) SELECT ?, role_id FROM admin_roles", (LEGACY_GUILD,))
+
+    for table in ("users", "daily_rewards", "shop_items", "admin_roles"):
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+    # Dropping the old tables dropped their indexes, these replace them per guild
+    conn.execute('''CREATE INDEX idx_users_guild_balance ON users(guild_id, balance)''')
+    conn.execute('''CREATE INDEX idx_daily_rewards_guild_last_claim ON daily_rewards(guild_id, last_claim)''')
+    conn.execute('''CREATE INDEX idx_shop_items_guild_name ON shop_items(guild_id, name)''')
+
+    conn.execute("ALTER TABLE purchases ADD COLUMN guild_id INTEGER NOT NULL DEFAULT 0")
+
+    conn.execute('''CREATE TABLE guild_config
+                (guild_id INTEGER PRIMARY KEY,
+                shop_channel_id INTEGER NOT NULL DEFAULT 0,
+                points_channel_id INTEGER NOT NULL DEFAULT 0)''')
+    conn.execute('''CREATE TABLE command_channels
+                (guild_id INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                PRIMARY KEY (guild_id, channel_id))''')
+
+def shop_item_categories(conn):
+    """Group shop items into categories for the paginated shop ('' is the default category)"""
+    conn.execute("ALTER TABLE shop_items ADD COLUMN category TEXT NOT NULL DEFAULT ''")
+
+def shop_message_ids(conn):
+    """Remember each guild's shop message so it can be edited in place"""
+    conn.execute("ALTER TABLE guild_config ADD COLUMN shop_message_id INTEGER NOT NULL DEFAULT 0")
+
+# (version, description, function) in the order they apply. Append new
+# migrations to the end and never edit one that has shipped.
+MIGRATIONS = [
+    (1, "initial schema", initial_schema),
+    (2, "indexes on users.balance and shop_items.name", lookup_indexes),
+    (3, "daily_rewards.last_claim as epoch seconds", epoch_last_claim),
+    (4, "guild-scoped economies", guild_scoped_tables),
+    (5, "shop item categories", shop_item_categories),
+    (6, "guild_config.shop_message_id", shop_message_ids),
+]
+
+def current_version(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_version
+                (version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at INTEGER)''')
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def migrate(conn):
+    """Apply every pending migration, each in its own transaction
+
+    Safe to run on every startup: applied versions are recorded in
+    schema_version and skipped. Returns the versions applied by this call.
+    """
+    version = current_version(conn)
+    conn.commit()
+    applied = []
+    for number, description, func in MIGRATIONS:
+        if number <= version:
+            continue
+        # BEGIN IMMEDIATE takes the write lock up front, and makes the DDL
+        # transactional (sqlite3 only opens transactions implicitly for DML)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            func(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (number, description, int(time.time()))
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            log.exception("Migration failed", version=number, description=description)
+            raise
+        log.info("Applied migration", version=number, description=description)
+        applied.append(number)
+    return applied
@@ -0,0 +1,155 @@
+import asyncio
+import collections
+import io
+import os
+import sys
+import threading
+import tracemalloc
+
+# Leaf frames in these stdlib modules mean the thread is parked (selector,
+# lock or queue wait), so those samples count as idle rather than CPU time
+IDLE_MODULES = ("selectors.py", "threading.py", "queue.py")
+# Leaf functions that block in C without a Python frame of their own, like
+# executor workers waiting for their next job
+IDLE_FUNCTIONS = {("thread.py", "_worker")}
+
+class SamplingProfiler:
+    """Statistical profiler that samples every thread's stack from a background thread
+
+    Nothing is instrumented, so the profiled code runs at full speed; the cost
+    is one sys._current_frames() call per interval, paid by the sampler thread.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = 0
+        self.idle_samples = 0
+        self.self_counts = collections.Counter()  # {function: samples where it was running}
+        self.total_counts = collections.Counter()  # {function: samples where it was on the stack}
+        self.thread_counts = collections.Counter()  # {thread name: busy samples}
+        self.stacks = collections.Counter()  # {"thread;outer;...;leaf": samples}, for flame graphs
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @staticmethod
+    def _function(code):
+        return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+    def _sample(self, own_ident, thread_names):
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            self.samples += 1
+            code = frame.f_code
+            if code.co_filename.endswith(IDLE_MODULES) or (os.path.basename(code.co_filename), code.co_name) in IDLE_FUNCTIONS:
+                self.idle_samples += 1
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(self._function(frame.f_code))
+                frame = frame.f_back
+            thread_name = thread_names.get(ident, str(ident))
+            self.thread_counts[thread_name] += 1
+            self.self_counts[stack[0]] += 1
+            for function in set(stack):
+                self.total_counts[function] += 1
+            self.stacks[";".join([thread_name] + stack[::-1])] += 1
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self.stop_event.is_set():
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self._sample(own_ident, thread_names)
+            self.stop_event.wait(self.interval)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+class ProfileResult:
+    """Outcome of one profiling window, with summaries and full text reports"""
+
+    def __init__(self, seconds, profiler, allocations):
+        self.seconds = seconds
+        self.profiler = profiler
+        self.allocations = allocations  # tracemalloc StatisticDiff list, largest growth first
+
+    @property
+    def busy_samples(self):
+        return self.profiler.samples - self.profiler.idle_samples
+
+    def top_functions(self, limit=10):
+        """[(function, self samples, cumulative samples)] by self samples"""
+        return [
+            (function, count, self.profiler.total_counts[function])
+            for function, count in self.profiler.self_counts.most_common(limit)
+        ]
+
+    def top_allocations(self, limit=10):
+        return self.allocations[:limit]
+
+    def report(self):
+        """Full plain-text report: every sampled function and allocation site"""
+        profiler = self.profiler
+        out = io.StringIO()
+        out.write(f"Profiled {self.seconds}s at {profiler.interval * 1000:g}ms intervals\n")
+        out.write(f"{profiler.samples} thread samples, {self.busy_samples} busy, {profiler.idle_samples} idle\n\n")
+
+        out.write("Busy samples per thread\n")
+        for thread_name, count in profiler.thread_counts.most_common():
+            out.write(f"{count:>8}  {thread_name}\n")
+
+        out.write("\nFunctions by self samples (self, cumulative, function)\n")
+        for function, count in profiler.self_counts.most_common():
+            out.write(f"{count:>8} {profiler.total_counts[function]:>8}  {function}\n")
+
+        out.write("\nFunctions by cumulative samples\n")
+        for function, count in profiler.total_counts.most_common():
+            out.write(f"{count:>8}  {function}\n")
+
+        out.write("\nAllocation growth by line (size diff, count diff, site)\n")
+        for stat in self.allocations:
+            frame = stat.traceback[0]
+            out.write(f"{stat.size_diff / 1024:>10.1f} KiB {stat.count_diff:>8}  {frame.filename}:{frame.lineno}\n")
+        return out.getvalue()
+
+    def folded_stacks(self):
+        """Stacks in the collapsed format flamegraph.pl and speedscope read"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.profiler.stacks.most_common())
+
+async def profile(seconds, interval=0.005):
+    """Sample every thread and trace allocations for the given number of seconds
+
+    Only awaits while profiling, so the bot keeps serving the workload that is
+    being measured.
+    """
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+        after = tracemalloc.take_snapshot()
+        if started_tracing:
+            tracemalloc.stop()
+
+    # Comparing snapshots is pure Python over every trace, keep it off the loop
+    allocations = await asyncio.to_thread(_allocation_growth, before, after)
+    return ProfileResult(seconds, profiler, allocations)
+
+def _allocation_growth(before, after):
+    """Allocation sites that grew during the window, largest first"""
+    # Leave out tracemalloc's and the sampler's own bookkeeping
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    return [stat for stat in diff if stat.size_diff > 0]
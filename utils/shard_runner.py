@@ -0,0 +1,132 @@
+"""Run the bot as several local processes, each handling a slice of the shards
+
+Starts the ledger process (utils.ledger_server), waits for its socket, then
+starts SHARD_PROCESSES copies of main.py with SHARD_COUNT, SHARD_IDS,
+LEDGER_SOCKET and their own PORT set. If any process exits the others are
+stopped too, so a supervisor (Docker, systemd) restarts the whole group.
+Run from the repository root:
+
+    SHARD_PROCESSES=4 SHARD_COUNT=auto python -m utils.shard_runner
+"""
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from dotenv import load_dotenv
+from utils.ledger_server import DEFAULT_SOCKET
+from utils.log import get_logger, setup_logging
+
+log = get_logger("shard_runner")
+
+def recommended_shards(token):
+    """Shard count Discord recommends for this bot (GET /gateway/bot)"""
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "DiscordBot (bitbuddy, 1.0)"}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)["shards"]
+
+def split_shards(shard_count, processes):
+    """Contiguous shard id ranges, one per process (as even as possible)"""
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for i in range(processes):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+def wait_for_socket(path, process, timeout=60):
+    """Wait until the ledger process accepts connections, False if it exited or timed out"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(path)
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def stop(processes, signum, timeout):
+    """Signal every running process, then kill whatever hasn't exited after timeout seconds"""
+    for process in processes:
+        if process.poll() is None:
+            process.send_signal(signum)
+    deadline = time.monotonic() + timeout
+    for process in processes:
+        try:
+            process.wait(timeout=max(0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            log.warning("Process did not stop in time, killing it", pid=process.pid)
+            process.kill()
+            process.wait()
+
+def main():
+    try:
+        load_dotenv(verbose=False)
+    except Exception:
+        pass
+    setup_logging()
+
+    token = os.getenv('DISCORD_TOKEN')
+    if not token:
+        raise ValueError("No Discord token found. Please set the DISCORD_TOKEN environment variable.")
+    processes = int(os.getenv('SHARD_PROCESSES', str(os.cpu_count() or 1)))
+    shard_count = os.getenv('SHARD_COUNT', 'auto')
+    shard_count = recommended_shards(token) if shard_count == 'auto' else int(shard_count)
+    socket_path = os.getenv('LEDGER_SOCKET', DEFAULT_SOCKET)
+    base_port = int(os.getenv('PORT', '8000'))
+    shutdown_timeout = float(os.getenv('SHUTDOWN_TIMEOUT', '30'))
+
+    stopping = []
+    def request_stop(signum, frame):
+        stopping.append(signum)
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    env = dict(os.environ, LEDGER_SOCKET=socket_path)
+    ledger = subprocess.Popen([sys.executable, "-m", "utils.ledger_server"], env=env)
+    if not wait_for_socket(socket_path, ledger):
+        log.error("Ledger process did not start", path=socket_path)
+        stop([ledger], signal.SIGTERM, shutdown_timeout)
+        sys.exit(1)
+
+    bots = []
+    for i, shard_ids in enumerate(split_shards(shard_count, processes)):
+        bot_env = dict(
+            env,
+            SHARD_COUNT=str(shard_count),
+            SHARD_IDS=",".join(map(str, shard_ids)),
+            PORT=str(base_port + i),
+        )
+        bots.append(subprocess.Popen([sys.executable, "main.py"], env=bot_env))
+        log.info("Started bot process", pid=bots[-1].pid, shard_ids=bot_env["SHARD_IDS"], port=bot_env["PORT"])
+    log.info("Sharded bot running", shard_count=shard_count, processes=len(bots), ledger_pid=ledger.pid)
+
+    exit_code = 0
+    while not stopping:
+        exited = [process for process in [ledger, *bots] if process.poll() is not None]
+        if exited:
+            for process in exited:
+                log.error("Process exited, stopping the rest", pid=process.pid, returncode=process.returncode)
+            exit_code = 1
+            break
+        time.sleep(1)
+
+    # Bots first, their shutdown flush goes through the ledger process
+    log.info("Stopping bot processes", processes=len(bots))
+    stop(bots, signal.SIGINT, shutdown_timeout)
+    stop([ledger], signal.SIGTERM, shutdown_timeout)
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
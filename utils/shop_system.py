@@ -1,38 +1,121 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
 import sqlite3
-from utils.embeds import create_shop_embed, create_purchase_embed
+import asyncio
 import os
 import time
-import traceback
+import uuid
 from utils.db_monitor import check_db_status
+from utils.database import remote_callable
+from utils.log import get_logger
 
-class ShopView(discord.ui.View):
-    def __init__(self, user, ctx, shop_items):
-        super().__init__()
-        self.user = user
-        self.ctx = ctx
-        self.shop_items = shop_items
+log = get_logger(__name__)
 
-        options = [
-            discord.SelectOption(label=item[1], description=f"{item[2]} points", value=str(item[0]))
-            for item in shop_items
-        ]
-        self.select_menu = discord.ui.Select(placeholder="Choose an item to buy...", options=options)
-        self.select_menu.callback = self.select_callback
-        self.add_item(self.select_menu)
+# Shop components use fixed custom ids and are all handled by one ShopInteractions
+# view registered with bot.add_view, so they keep working across restarts. Page
+# buttons carry their target in the custom id (NAV_ID:page:category) and are
+# routed to the same view by ShopSystem.on_interaction.
+BUY_ID = "bitbuddy:shop:buy"
+CATEGORY_ID = "bitbuddy:shop:category"
+NAV_ID = "bitbuddy:shop:nav"
 
-    async def select_callback(self, interaction: discord.Interaction):
-        if interaction.user != self.user:
-            await interaction.response.send_message("This shop isn't for you.", ephemeral=True)
-            return
+# The category select shows this many categories, plus an option for the next group
+CATEGORY_GROUP = 24
+
+def category_label(category):
+    return (category or "General")[:100]
+
+def page_value(category, page):
+    """Option value or custom id suffix for a category/page, the state a click carries back"""
+    return f"{page}:{category}"
+
+def category_options(catalog, category):
+    """Options for the category select: the current category's group, and a way to the next one
+
+    Selects hold at most 25 options, so past 25 categories they are shown 24
+    at a time, the last option opening the first category of the next group.
+    """
+    categories = catalog.categories
+    start = 0
+    if len(categories) > 25 and category in categories:
+        start = categories.index(category) // CATEGORY_GROUP * CATEGORY_GROUP
+    group = categories if len(categories) <= 25 else categories[start:start + CATEGORY_GROUP]
+    options = [
+        discord.SelectOption(label=category_label(name), value=page_value(name, 0), default=name == category)
+        for name in group
+    ]
+    if len(group) < len(categories):
+        following = start + CATEGORY_GROUP if start + CATEGORY_GROUP < len(categories) else 0
+        options.append(discord.SelectOption(
+            label="More categories..." if following else "Back to the first categories...",
+            value=page_value(categories[following], 0),
+            description=f"Categories {following + 1}-{min(following + CATEGORY_GROUP, len(categories))} of {len(categories)}"
+        ))
+    return options
+
+def shop_page(catalog, category=None, page=0):
+    """Components for one page of one category of the shop
+
+    The view only describes the layout: it is stopped before it is returned,
+    so discord.py doesn't keep it around after sending, and clicks on it are
+    dispatched to ShopInteractions by custom id. Only the visible page's
+    options are sent, which keeps every select under Discord's 25-option limit.
+    """
+    if category is None:
+        category = catalog.categories[0] if catalog.categories else ""
+    view = discord.ui.View(timeout=None)
+    options = catalog.page(category, page)
+    if options:
+        # Options are shared between pages, copy the list so Select can't modify the cached one
+        view.add_item(discord.ui.Select(custom_id=BUY_ID, placeholder="Choose an item to buy...", options=list(options), row=0))
 
-        item_id = int(self.select_menu.values[0])
-        selected_item = next(item for item in self.shop_items if item[0] == item_id)
+    if len(catalog.categories) > 1:
+        view.add_item(discord.ui.Select(
+            custom_id=CATEGORY_ID, placeholder="Choose a category...", row=1,
+            options=category_options(catalog, category)
+        ))
+
+    page_count = catalog.page_count(category)
+    if page_count > 1:
+        view.add_item(discord.ui.Button(
+            label="◀ Previous", style=discord.ButtonStyle.secondary, row=2, disabled=page == 0,
+            custom_id=f"{NAV_ID}:{page_value(category, max(0, page - 1))}"
+        ))
+        view.add_item(discord.ui.Button(label=f"Page {page + 1}/{page_count}", style=discord.ButtonStyle.secondary, row=2, disabled=True))
+        view.add_item(discord.ui.Button(
+            label="Next ▶", style=discord.ButtonStyle.secondary, row=2, disabled=page >= page_count - 1,
+            custom_id=f"{NAV_ID}:{page_value(category, min(page + 1, page_count - 1))}"
+        ))
+    view.stop()
+    return view
+
+class ShopInteractions(discord.ui.View):
+    """Handles every shop component click, in every guild, from a single view
+
+    Nothing is stored per user or per message: the clicking member and guild
+    come from the interaction, and the category and page from the selected
+    value or the clicked button's custom id.
+    """
+
+    def __init__(self, bot):
+        super().__init__(timeout=None)
+        self.bot = bot
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        return interaction.guild is not None
+
+    @discord.ui.select(custom_id=BUY_ID)
+    async def buy(self, interaction: discord.Interaction, select: discord.ui.Select):
+        catalog = await self.bot.catalog.get(interaction.guild.id)
+        selected_item = catalog.by_id.get(int(select.values[0]))
+        if selected_item is None:
+            await interaction.response.send_message("That item is no longer in the shop.", ephemeral=True)
+            return
         item_name = selected_item[1]
         item_price = selected_item[2]
         
-        view = ConfirmPurchase(selected_item, self.user, self.ctx)
+        view = ConfirmPurchase(selected_item, interaction.user, interaction.guild, self.bot)
         await interaction.response.send_message(
             embed=discord.Embed(
                 title="🛒 Confirm Purchase",
@@ -43,89 +126,185 @@ class ShopView(discord.ui.View):
             ephemeral=True
         )
 
+    @discord.ui.select(custom_id=CATEGORY_ID)
+    async def choose_category(self, interaction: discord.Interaction, select: discord.ui.Select):
+        await self.show_page(interaction, select.values[0])
+
+    async def show_page(self, interaction, value):
+        """Show a page to the clicking member only
+
+        Clicks on the shared shop message open an ephemeral copy at the chosen
+        page, clicks inside that copy edit it in place.
+        """
+        page, _, category = value.partition(":")
+        catalog = await self.bot.catalog.get(interaction.guild.id)
+        page = max(0, min(int(page), catalog.page_count(category) - 1))
+        content = f"🛍️ **{category_label(category)}** - page {page + 1}/{catalog.page_count(category)}"
+        view = shop_page(catalog, category, page)
+        if interaction.message is not None and interaction.message.flags.ephemeral:
+            await interaction.response.edit_message(content=content, view=view)
+        else:
+            await interaction.response.send_message(content, view=view, ephemeral=True)
+
+@remote_callable
+def record_purchase(conn, ledger, token, guild_id, user_id, item_id, price):
+    """Debit the price and record the purchase in one transaction (runs on the database writer)
+
+    Returns ("duplicate", None) if this token was already used, ("insufficient", None)
+    if the balance is too low, otherwise ("completed", new committed balance).
+    """
+    if conn.execute("SELECT 1 FROM purchases WHERE token = ?", (token,)).fetchone():
+        return "duplicate", None
+    
+    new_balance = ledger.apply_debit(conn, guild_id, user_id, price)
+    if new_balance is None:
+        return "insufficient", None
+    
+    conn.execute(
+        '''INSERT INTO purchases (token, guild_id, user_id, item_id, price, status, created_at)
+           VALUES (?, ?, ?, ?, ?, 'completed', ?)''',
+        (token, guild_id, user_id, item_id, price, int(time.time()))
+    )
+    return "completed", new_balance
+
+@remote_callable
+def refund_purchase(conn, ledger, token, guild_id, user_id, price):
+    """Give the coins back for a purchase whose role couldn't be granted"""
+    updated = conn.execute(
+        "UPDATE purchases SET status = 'refunded' WHERE token = ? AND status = 'completed'", (token,)
+    ).rowcount
+    if updated:
+        ledger.apply_credit(conn, guild_id, user_id, price)
+
 class ConfirmPurchase(discord.ui.View):
-    def __init__(self, item, user, ctx):
+    def __init__(self, item, user, guild, bot):
         super().__init__()
-        self.item = item  # (id, name, price, role_id)
+        self.item = item  # (id, name, price, role_id, category)
         self.user = user
-        self.ctx = ctx
+        self.guild = guild
+        self.bot = bot
+        self.token = uuid.uuid4().hex  # Idempotency key, a confirmation can only ever debit once
+        self.used = False
+
+    def disable_buttons(self):
+        for child in self.children:
+            child.disabled = True
 
     @discord.ui.button(label="Confirm", style=discord.ButtonStyle.success)
     async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
         if interaction.user != self.user:
             await interaction.response.send_message("You can't confirm someone else's purchase.", ephemeral=True)
             return
+        
+        # Repeated clicks that arrive before the buttons are disabled are no-ops
+        if self.used:
+            await interaction.response.defer()
+            return
+        self.used = True
+        self.disable_buttons()
+        self.stop()
+        await interaction.response.edit_message(view=self)
 
+        item_id = self.item[0]
         item_name = self.item[1]
         item_price = self.item[2]
         role_id = self.item[3]
 
+        role = self.guild.get_role(role_id)
+        if not role:
+            await interaction.edit_original_response(content="Role not found. Please contact an admin.", embed=None, view=None)
+            return
+
+        ledger = self.bot.ledger
+        guild_id = self.guild.id
         try:
-            conn = sqlite3.connect(os.getenv('DB_PATH', 'shop.db'))
-            c = conn.cursor()
+            # The debit is conditional on the committed balance, so write buffered earnings first
+            await ledger.flush()
+            status, _ = await ledger.transaction(
+                record_purchase, self.token, guild_id, self.user.id, item_id, item_price
+            )
             
-            c.execute("SELECT balance FROM users WHERE user_id = ?", (self.user.id,))
-            result = c.fetchone()
+            if status == "duplicate":
+                return
             
-            if not result or result[0] < item_price:
-                await interaction.response.send_message(
+            if status == "insufficient":
+                await interaction.edit_original_response(
                     embed=discord.Embed(
                         title="❌ Purchase Failed",
                         description=f"Insufficient balance to purchase {item_name}",
                         color=discord.Color.red()
                     ),
-                    ephemeral=True
+                    view=None
                 )
                 return
             
-            new_balance = result[0] - item_price
-            c.execute("UPDATE users SET balance = ? WHERE user_id = ?", (new_balance, self.user.id))
-            conn.commit()
-            
-            role = self.ctx.guild.get_role(role_id)
-            if role:
+            try:
                 await self.user.add_roles(role)
-                await interaction.response.send_message(
-                    embed=discord.Embed(
-                        title="✅ Purchase Successful",
-                        description=f"You have purchased {item_name} for {item_price} points!",
-                        color=discord.Color.green()
-                    ),
-                    ephemeral=True
-                )
-            else:
-                await interaction.response.send_message("Role not found. Please contact an admin.", ephemeral=True)
+            except discord.HTTPException:
+                await ledger.transaction(refund_purchase, self.token, guild_id, self.user.id, item_price)
+                raise
             
-        except Exception as e:
-            print(f"Purchase error: {str(e)}")
-            traceback.print_exc()
-            await interaction.response.send_message("There was an error processing your purchase. Please try again later.", ephemeral=True)
-        finally:
-            if 'conn' in locals():
-                conn.close()
+            await interaction.edit_original_response(
+                embed=discord.Embed(
+                    title="✅ Purchase Successful",
+                    description=f"You have purchased {item_name} for {item_price} points!",
+                    color=discord.Color.green()
+                ),
+                view=None
+            )
+            
+        except Exception:
+            log.exception("Purchase error", user_id=self.user.id, item_id=item_id, token=self.token)
+            await interaction.edit_original_response(
+                content="There was an error processing your purchase. Please try again later.",
+                embed=None,
+                view=None
+            )
 
     @discord.ui.button(label="Cancel", style=discord.ButtonStyle.danger)
     async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user == self.user:
-            await interaction.response.send_message("❌ Purchase cancelled.", ephemeral=True)
+        if interaction.user == self.user and not self.used:
+            self.used = True
+            self.disable_buttons()
+            self.stop()
+            await interaction.response.edit_message(content="❌ Purchase cancelled.", embed=None, view=self)
 
 class ShopSystem(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.db_path = os.getenv('DB_PATH', 'shop.db')
-        
-        # Initialize with bot attributes
-        self.shop_channel_id = bot.shop_channel_id
-        self.command_channels = bot.command_channels
-        
-        print(f"ShopSystem: Initialized with shop channel ID: {self.shop_channel_id}")
-        print(f"ShopSystem: Command channels: {self.command_channels}")
-        print(f"ShopSystem: Bot command prefix: {bot.command_prefix}")
+        self.db = bot.db
+        self.guild_configs = bot.guild_configs  # Shop and command channels, per guild
+        self.interactions = ShopInteractions(bot)
+        self.refresh_delay = float(os.getenv('SHOP_REFRESH_DELAY', '2'))
+        self.refresh_due = {}  # {guild_id: loop time the guild's shop message refresh may run}
+        self.refresh_tasks = {}  # {guild_id: task waiting to refresh the shop message}
+        self.refresh_locks = {}  # {guild_id: Lock}, one edit or post of a guild's shop message at a time
+        self.startup_task = None
+
+    async def cog_load(self):
+        # Persistent: handles clicks on shop messages sent before this process started
+        self.bot.add_view(self.interactions)
+        self.startup_task = asyncio.create_task(self.post_missing_shop_messages())
+
+    def cog_unload(self):
+        self.interactions.stop()
+        if self.startup_task is not None:
+            self.startup_task.cancel()
+        for task in self.refresh_tasks.values():
+            task.cancel()
+
+    @commands.Cog.listener()
+    async def on_interaction(self, interaction):
+        # Page buttons have a custom id per target page, so the persistent view can't match them itself
+        custom_id = (interaction.data or {}).get("custom_id", "")
+        if interaction.type == discord.InteractionType.component and custom_id.startswith(f"{NAV_ID}:"):
+            if interaction.guild is not None:
+                await self.interactions.show_page(interaction, custom_id[len(NAV_ID) + 1:])
 
     def verify_channel_permissions(self, channel):
         """Verify bot has necessary permissions in the channel"""
         if not channel:
-            print("Channel verification failed: channel is None")
+            log.warning("Channel verification failed: channel is None")
             return False
             
         permissions = channel.permissions_for(channel.guild.me)
@@ -138,195 +317,191 @@ class ShopSystem(commands.Cog):
         
         has_permissions = all(required_permissions)
         if not has_permissions:
-            print(f"Missing permissions in channel {channel.id}:")
-            if not permissions.send_messages:
-                print("- Send Messages")
-            if not permissions.read_messages:
-                print("- Read Messages")
-            if not permissions.embed_links:
-                print("- Embed Links")
-            if not permissions.attach_files:
-                print("- Attach Files")
+            missing = [
+                name for name, granted in (
+                    ("Send Messages", permissions.send_messages),
+                    ("Read Messages", permissions.read_messages),
+                    ("Embed Links", permissions.embed_links),
+                    ("Attach Files", permissions.attach_files)
+                ) if not granted
+            ]
+            log.warning("Missing permissions", channel_id=channel.id, missing=", ".join(missing))
         
         return has_permissions
 
-    def connect_with_retry(self, max_retries=5, retry_delay=2):
-        """Establish database connection with retry logic"""
-        retries = 0
-        last_error = None
-        
-        while retries < max_retries:
-            try:
-                conn = sqlite3.connect(self.db_path)
-                return conn
-            except sqlite3.Error as e:
-                last_error = e
-                retries += 1
-                if retries < max_retries:
-                    time.sleep(retry_delay)
-                    retry_delay *= 1.5  # Exponential backoff
-        
-        # If all retries fail, run diagnostics
-        check_db_status()
-        raise last_error or sqlite3.Error("Failed to connect to database after multiple attempts")
-
-    @commands.command()
+    @commands.hybrid_command()
     @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
     async def updateprice(self, ctx, item_name: str, new_price: int):
         """Update the price of an item in the shop"""
-        print(f"\nUpdateprice command called:")
-        print(f"- Channel ID: {ctx.channel.id}")
-        print(f"- Author: {ctx.author.name}")
-        print(f"- Command channels: {self.command_channels}")
-        print(f"- Message content: {ctx.message.content}")
+        log.debug(
+            "Updateprice command called", channel_id=ctx.channel.id,
+            author=ctx.author.name, content=ctx.message.content
+        )
         
-        if not self.command_channels:
-            print("Command rejected: No command channels configured")
-            return await ctx.send("❌ Command channels not configured. Please contact an administrator.")
-            
-        if ctx.channel.id not in self.command_channels:
-            print(f"Command rejected: Channel {ctx.channel.id} not in command channels")
-            return await ctx.send(f"❌ This command can only be used in designated command channels: {', '.join(str(c) for c in self.command_channels)}")
+        config = self.guild_configs.get(ctx.guild.id)
+        if not config.allows_commands(ctx.channel.id):
+            log.debug("Command rejected: channel not in command channels", channel_id=ctx.channel.id)
+            return await ctx.send(f"❌ This command can only be used in designated command channels: {', '.join(str(c) for c in config.command_channels)}")
         
         if not self.verify_channel_permissions(ctx.channel):
-            print("Command rejected: Missing permissions")
+            log.debug("Command rejected: missing permissions", channel_id=ctx.channel.id)
             return await ctx.send("❌ Bot does not have required permissions in this channel.")
         
-        print("Command accepted, processing...")
         try:
-            conn = self.connect_with_retry()
-            c = conn.cursor()
+            # Emoji and case don't matter, several matches are listed rather than guessed between
+            catalog = await self.bot.catalog.get(ctx.guild.id)
+            lookup = catalog.index.resolve(item_name)
+            if lookup.problem:
+                log.debug("Item not resolved", item=item_name, matches=len(lookup.items))
+                return await ctx.send(lookup.problem)
+            item = lookup.item
             
             # Update the price
-            c.execute("UPDATE shop_items SET price = ? WHERE name = ?", (new_price, item_name))
-            if c.rowcount == 0:
-                print(f"Item '{item_name}' not found")
-                await ctx.send(f"❌ Item '{item_name}' not found in the shop.")
+            rowcount = await self.db.execute(
+                "UPDATE shop_items SET price = ? WHERE id = ? AND guild_id = ?", (new_price, item[0], ctx.guild.id)
+            )
+            if rowcount == 0:
+                log.debug("Item not found", item=item[1])
+                await ctx.send(f"❌ Item '{item[1]}' not found in the shop.")
                 return
             
-            conn.commit()
-            print(f"Price updated successfully: {item_name} -> {new_price}")
-            await ctx.send(f"✅ Updated price of '{item_name}' to {new_price} points.")
+            self.bot.catalog.invalidate(ctx.guild.id)
+            log.info("Price updated", guild_id=ctx.guild.id, item=item[1], price=new_price)
+            await ctx.send(f"✅ Updated price of '{item[1]}' to {new_price} points.")
             
-            # Update the shop UI
-            await self.update_shop_ui()
+            # Refresh the shop message (debounced, a batch of price changes is one edit)
+            await self.update_shop_ui(ctx.guild.id)
             
         except sqlite3.Error as e:
-            print(f"Database error: {str(e)}")
+            log.error("Database error", error=e)
             await ctx.send(f"❌ Database error: {str(e)}")
-            check_db_status()
+            # Diagnostics scan the whole database, keep them off the event loop
+            await asyncio.to_thread(check_db_status)
+
+    @updateprice.autocomplete("item_name")
+    async def item_name_autocomplete(self, interaction, current):
+        """Suggest the guild's items as the name is typed (slash command only)"""
+        catalog = await self.bot.catalog.get(interaction.guild_id)
+        # The id is what gets submitted, it names the item even when names collide or are long
+        return [
+            app_commands.Choice(name=item[1][:100], value=f"#{item[0]}")
+            for item in catalog.index.complete(current)
+        ]
+
+    async def update_shop_ui(self, guild_id):
+        """Refresh the guild's shop message soon, calls in quick succession share one edit
+
+        Each call pushes the refresh back to SHOP_REFRESH_DELAY seconds from now,
+        so a batch of price changes ends in a single edit of the latest catalog.
+        """
+        self.refresh_due[guild_id] = asyncio.get_running_loop().time() + self.refresh_delay
+        task = self.refresh_tasks.get(guild_id)
+        if task is None or task.done():
+            self.refresh_tasks[guild_id] = asyncio.create_task(self._refresh_when_quiet(guild_id))
+
+    async def _refresh_when_quiet(self, guild_id):
+        loop = asyncio.get_running_loop()
+        try:
+            # Loops again if a change arrived while the previous edit was in progress
+            while guild_id in self.refresh_due:
+                delay = self.refresh_due[guild_id] - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                del self.refresh_due[guild_id]
+                await self.refresh_shop_message(guild_id)
         finally:
-            if 'conn' in locals():
-                conn.close()
+            self.refresh_tasks.pop(guild_id, None)
+
+    async def post_missing_shop_messages(self):
+        """Post the shop message in guilds with a shop channel but no message yet
+
+        Covers channels set without posting, like the one a legacy deployment's
+        SHOP_CHANNEL_ID seeds when its data is claimed. Only this process's guilds.
+        """
+        await self.bot.wait_until_ready()
+        for guild_id, config in list(self.guild_configs.configs.items()):
+            if config.shop_channel_id and not config.shop_message_id and self.bot.get_guild(guild_id) is not None:
+                log.info("Posting missing shop message", guild_id=guild_id, channel_id=config.shop_channel_id)
+                await self.refresh_shop_message(guild_id)
+
+    async def refresh_shop_message(self, guild_id):
+        """Edit the shop message in the guild's shop channel, posting it if there isn't one
 
-    async def update_shop_ui(self):
-        """Update the shop UI in the designated channel"""
-        if not self.shop_channel_id:
-            print("Shop channel ID not set")
+        Direct calls (postshop, setchannel) can overlap the debounced refresh,
+        the per-guild lock makes the second one edit the message the first posted.
+        """
+        async with self.refresh_locks.setdefault(guild_id, asyncio.Lock()):
+            await self._refresh_shop_message(guild_id)
+
+    async def _refresh_shop_message(self, guild_id):
+        # Read under the lock, so a message posted by the previous holder is edited, not posted again
+        config = self.guild_configs.get(guild_id)
+        if not config.shop_channel_id:
+            log.warning("Shop channel ID not set", guild_id=guild_id)
             return
             
         try:
-            channel = self.bot.get_channel(self.shop_channel_id)
+            channel = self.bot.get_channel(config.shop_channel_id)
             if not channel:
-                print(f"Shop channel {self.shop_channel_id} not found")
+                log.warning("Shop channel not found", channel_id=config.shop_channel_id)
                 return
             
-            # Delete old shop message
-            async for message in channel.history(limit=1):
-                await message.delete()
+            catalog = await self.bot.catalog.get(guild_id)
+            embed, view = catalog.embed, shop_page(catalog)
+            if config.shop_message_id:
+                try:
+                    # One REST call, no fetch first
+                    await channel.get_partial_message(config.shop_message_id).edit(embed=embed, view=view)
+                    return
+                except discord.NotFound:
+                    log.info("Shop message was deleted, posting a new one", guild_id=guild_id, message_id=config.shop_message_id)
             
-            # Create and send new shop message
-            embed = await self.create_shop_embed()
-            if embed:
-                await channel.send(embed=embed)
+            # Every member browses and buys from this one message
+            message = await channel.send(embed=embed, view=view)
+            await self.guild_configs.set_shop_message(guild_id, message.id)
             
-        except Exception as e:
-            print(f"Error updating shop UI: {str(e)}")
-            traceback.print_exc()
-
-    async def create_shop_embed(self):
-        """Create the shop embed with current prices"""
-        try:
-            conn = self.connect_with_retry()
-            c = conn.cursor()
-            
-            c.execute("SELECT COUNT(*) FROM shop_items")
-            item_count = c.fetchone()[0]
-            
-            embed = discord.Embed(
-                title="🏪 Shop",
-                description="Welcome to the shop! Use the dropdown menu below to browse and purchase items.",
-                color=discord.Color.blue()
-            )
-            
-            embed.add_field(
-                name="How to Shop",
-                value="1. Select an item from the dropdown menu\n2. Review the item details\n3. Click Confirm to purchase or Cancel to abort",
-                inline=False
-            )
-            
-            embed.add_field(
-                name="Available Items",
-                value=f"There are currently {item_count} items available for purchase.",
-                inline=False
-            )
-            
-            embed.set_footer(text="All purchases are final. Please ensure you have enough points before confirming.")
-            
-            return embed
-            
-        except Exception as e:
-            print(f"Error creating shop embed: {str(e)}")
-            traceback.print_exc()
-            return None
-        finally:
-            if 'conn' in locals():
-                conn.close()
+        except Exception:
+            log.exception("Error updating shop UI")
 
     @commands.command()
     async def shop(self, ctx):
         """Display the shop"""
-        print(f"\nShop command called:")
-        print(f"- Channel ID: {ctx.channel.id}")
-        print(f"- Author: {ctx.author.name}")
-        print(f"- Command channels: {self.command_channels}")
-        print(f"- Message content: {ctx.message.content}")
+        log.debug(
+            "Shop command called", channel_id=ctx.channel.id,
+            author=ctx.author.name, content=ctx.message.content
+        )
         
-        if not self.command_channels:
-            print("Command rejected: No command channels configured")
-            return await ctx.send("❌ Command channels not configured. Please contact an administrator.")
-            
-        if ctx.channel.id not in self.command_channels:
-            print(f"Command rejected: Channel {ctx.channel.id} not in command channels")
-            return await ctx.send(f"❌ This command can only be used in designated command channels: {', '.join(str(c) for c in self.command_channels)}")
+        config = self.guild_configs.get(ctx.guild.id)
+        if not config.allows_commands(ctx.channel.id):
+            log.debug("Command rejected: channel not in command channels", channel_id=ctx.channel.id)
+            return await ctx.send(f"❌ This command can only be used in designated command channels: {', '.join(str(c) for c in config.command_channels)}")
         
         if not self.verify_channel_permissions(ctx.channel):
-            print("Command rejected: Missing permissions")
+            log.debug("Command rejected: missing permissions", channel_id=ctx.channel.id)
             return await ctx.send("❌ Bot does not have required permissions in this channel.")
         
-        print("Command accepted, processing...")
         try:
-            conn = self.connect_with_retry()
-            c = conn.cursor()
-            
-            c.execute("SELECT id, name, price, role_id FROM shop_items")
-            shop_items = c.fetchall()
+            # Served from the guild's in-memory catalog, no database round-trips
+            catalog = await self.bot.catalog.get(ctx.guild.id)
             
-            if not shop_items:
+            if not catalog.items:
                 await ctx.send("The shop is currently empty!")
                 return
             
-            embed = await self.create_shop_embed()
-            view = ShopView(ctx.author, ctx, shop_items)
-            await ctx.send(embed=embed, view=view)
+            # Guilds with a shop channel share its persistent shop message
+            shop_channel_id = self.guild_configs.get(ctx.guild.id).shop_channel_id
+            if shop_channel_id and ctx.channel.id != shop_channel_id:
+                await ctx.send(f"🛍️ Browse and buy items in <#{shop_channel_id}>.")
+                return
             
-        except Exception as e:
-            print(f"Error displaying shop: {str(e)}")
-            traceback.print_exc()
+            # Stateless components, clicks are handled by ShopInteractions like the shop message's
+            await ctx.send(embed=catalog.embed, view=shop_page(catalog))
+            
+        except Exception:
+            log.exception("Error displaying shop")
             await ctx.send("❌ There was an error accessing the shop. Please try again later.")
-        finally:
-            if 'conn' in locals():
-                conn.close()
 
 async def setup(bot):
     await bot.add_cog(ShopSystem(bot))
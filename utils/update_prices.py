@@ -1,85 +1,147 @@
+"""Reprice the shop from the pricing rules in prices.json
+
+Each rule names an item and its price. Rules are resolved against every
+guild's catalog the same way admin commands resolve names (the exact name
+first, then without emoji or case, then an unambiguous word prefix), and only
+items whose price differs are written, in one executemany. Run from the
+repository root to reprice every guild (--dry-run only prints the diff):
+
+    python -m utils.update_prices [--dry-run]
+
+In the bot, !admin updateprices does the same for one guild.
+"""
+import json
 import os
-import sqlite3
 import sys
+from utils.database import DatabaseConfig, connect, remote_callable
+from utils.item_index import ItemIndex
+from utils.log import get_logger, setup_logging
+
+log = get_logger(__name__)
+
+PRICES_FILE = os.getenv('PRICES_FILE', 'prices.json')
+
+def load_price_rules(path=PRICES_FILE):
+    """Read a pricing rules file, returning (version, [(item, price), ...])
+
+    Raises OSError if the file can't be read and ValueError if it isn't valid.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    try:
+        version = data["version"]
+        rules = [(str(rule["item"]), int(rule["price"])) for rule in data["rules"]]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"{path}: every rule needs an item and an integer price, and the file a version ({e!r})") from None
+    if any(price < 0 for _, price in rules):
+        raise ValueError(f"{path}: prices can't be negative")
+    return version, rules
+
+class PriceDiff:
+    """What a set of pricing rules changes in the shop"""
+
+    def __init__(self, version):
+        self.version = version
+        self.changes = []  # [(guild_id, item_id, name, old_price, new_price), ...]
+        self.unchanged = 0  # Matched items already at their price
+        self.unmatched = []  # [(guild_id, rule item, [names it could mean]), ...], not applied
+
+def plan_prices(items, rules, version=None):
+    """Compare rules against catalog rows (guild_id, id, name, price), without writing anything
+
+    Each item takes the price of the first rule that names it. Rules are
+    names, never item ids, which differ between databases.
+    """
+    diff = PriceDiff(version)
+    by_guild = {}
+    for guild_id, item_id, name, price in items:
+        by_guild.setdefault(guild_id, []).append((item_id, name, price))
+    for guild_id, guild_items in by_guild.items():
+        index = ItemIndex(guild_items)
+        priced = set()
+        for rule_item, price in rules:
+            lookup = index.resolve(rule_item, ids=False)
+            item = lookup.item
+            if item is None:
+                candidates = [] if lookup.fuzzy else [candidate[1] for candidate in lookup.items]
+                diff.unmatched.append((guild_id, rule_item, candidates))
+                continue
+            item_id, name, old_price = item
+            if item_id in priced:
+                continue
+            priced.add(item_id)
+            if old_price == price:
+                diff.unchanged += 1
+            else:
+                diff.changes.append((guild_id, item_id, name, old_price, price))
+    return diff
+
+@remote_callable
+def apply_new_prices(conn, rules, version=None, guild_id=None, dry_run=False):
+    """Apply pricing rules using an existing connection (the caller commits or rolls back)
+
+    Reprices one guild's shop, or every guild's when guild_id is None (the CLI).
+    The diff is computed from the rows read in this transaction, so it is
+    exactly what was written. Returns the PriceDiff.
+    """
+    if guild_id is None:
+        items = conn.execute("SELECT guild_id, id, name, price FROM shop_items ORDER BY id").fetchall()
+    else:
+        items = conn.execute(
+            "SELECT guild_id, id, name, price FROM shop_items WHERE guild_id = ? ORDER BY id", (guild_id,)
+        ).fetchall()
+    diff = plan_prices(items, rules, version)
+
+    if not dry_run and diff.changes:
+        conn.executemany(
+            "UPDATE shop_items SET price = ? WHERE id = ? AND guild_id = ?",
+            [(new_price, item_id, item_guild_id) for item_guild_id, item_id, _, _, new_price in diff.changes]
+        )
+    log.info(
+        "Applied pricing rules" if not dry_run else "Planned pricing rules", version=version, guild_id=guild_id,
+        items=len(items), changed=len(diff.changes), unchanged=diff.unchanged, unmatched=len(diff.unmatched)
+    )
+    return diff
+
+def update_shop_prices(dry_run=False):
+    """Reprice every guild's shop from PRICES_FILE, returning True on success"""
+    config = DatabaseConfig()
+    db_path = config.db_path
+
+    log.info("Updating shop prices", path=db_path, rules=PRICES_FILE)
 
-def update_shop_prices():
-    """Update existing shop item prices to new balanced values"""
-    db_path = os.getenv('DB_PATH', 'shop.db')
-    
-    print(f"\n===== UPDATING SHOP PRICES =====")
-    print(f"Database Path: {db_path}")
-    
     if not os.path.exists(db_path):
-        print("❌ Database file not found!")
+        log.error("❌ Database file not found!")
         return False
-    
+
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Get current prices
-        cursor.execute("SELECT id, name, price, role_id FROM shop_items")
-        items = cursor.fetchall()
-        
-        if not items:
-            print("❌ No shop items found in database!")
-            return False
-        
-        print(f"Found {len(items)} shop items in database.")
-        print("\nCURRENT PRICES:")
-        for item in items:
-            print(f"  - {item[1]}: {item[2]:,} coins")
-        
-        # Define new prices
-        new_prices = {
-            "Furina": 50000,
-            "Navia": 50000,
-            "Raiden Shogun": 50000,
-            "One Piece": 50000,
-            "Naruto": 50000,
-            "Bleach": 50000,
-            "VIP": 100000
-        }
-        
-        # Update prices for each item
-        updated_count = 0
-        for item in items:
-            item_id, name, old_price, role_id = item
-            clean_name = name.strip("🪼🌟🌸☠🦊愛💎")  # Remove emojis
-            
-            # Find matching item
-            for key in new_prices:
-                if key in clean_name:
-                    cursor.execute("UPDATE shop_items SET price = ? WHERE id = ?", (new_prices[key], item_id))
-                    print(f"✅ Updated {name}: {old_price:,} -> {new_prices[key]:,} coins")
-                    updated_count += 1
-                    break
-        
-        conn.commit()
-        
-        # Verify updates
-        cursor.execute("SELECT id, name, price FROM shop_items")
-        updated_items = cursor.fetchall()
-        
-        print(f"\nSUCCESSFULLY UPDATED {updated_count} ITEMS!")
-        print("\nNEW PRICES:")
-        for item in updated_items:
-            print(f"  - {item[1]}: {item[2]:,} coins")
-        
+        version, rules = load_price_rules()
+        conn = connect(config)
+        with conn:
+            diff = apply_new_prices(conn, rules, version, dry_run=dry_run)
         conn.close()
-        return True
-    
+
     except Exception as e:
-        print(f"❌ Error updating shop prices: {e}")
+        log.error("❌ Error updating shop prices", error=e)
         return False
 
+    for guild_id, _, name, old_price, new_price in diff.changes:
+        log.info("✅ Price changed" if not dry_run else "Price would change", guild_id=guild_id, item=name, old_price=old_price, new_price=new_price)
+    for guild_id, rule_item, candidates in diff.unmatched:
+        log.warning("Rule matched no single item", guild_id=guild_id, rule=rule_item, candidates=", ".join(candidates))
+    return True
+
 if __name__ == "__main__":
-    print("Running shop price update script...")
-    if update_shop_prices():
-        print("\nShop prices have been successfully updated! 🎉")
-        print("Note: This won't affect shop items displayed in existing embeds.")
-        print("Users will see new prices when they use !shop command.")
+    setup_logging()
+    log.info("Running shop price update script...")
+    dry_run = "--dry-run" in sys.argv[1:]
+    if update_shop_prices(dry_run):
+        if not dry_run:
+            log.info(
+                "Shop prices have been successfully updated! 🎉 A running bot caches the shop catalog in memory, "
+                "restart it (or use !admin updateprices instead) for users to see the new prices."
+            )
         sys.exit(0)
     else:
-        print("\nFailed to update shop prices. Check the errors above.")
+        log.error("Failed to update shop prices. Check the errors above.")
         sys.exit(1) 
\ No newline at end of file
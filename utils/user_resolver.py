@@ -0,0 +1,52 @@
+import discord
+from utils.cache import LRUCache
+
+class UserResolver:
+    """Resolve user ids to discord.User objects with as few REST calls as possible
+
+    Lookups try, in order: the gateway user cache (bot.get_user), the member
+    cache of the guild the caller names, a bounded LRU of users we had to fetch
+    before, and finally bot.fetch_user. Each tier has its own counter.
+    """
+
+    def __init__(self, bot, cache_size=5000):
+        self.bot = bot
+        self.fetched = LRUCache(cache_size)
+        self.counters = {"gateway": 0, "member": 0, "lru": 0, "api": 0, "not_found": 0}
+
+    async def resolve(self, user_id, guild_id=None):
+        """Return the user, or None if they no longer exist
+
+        guild_id is the guild the user was seen in, its member cache is the
+        only one checked, so a lookup costs the same however many guilds the bot is in.
+        """
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            self.counters["gateway"] += 1
+            return user
+
+        guild = self.bot.get_guild(guild_id) if guild_id is not None else None
+        member = guild.get_member(user_id) if guild is not None else None
+        if member is not None:
+            self.counters["member"] += 1
+            return member
+
+        user = self.fetched.get(user_id)
+        if user is not None:
+            self.counters["lru"] += 1
+            return user
+
+        try:
+            user = await self.bot.fetch_user(user_id)
+        except discord.NotFound:
+            self.counters["not_found"] += 1
+            return None
+        self.counters["api"] += 1
+        self.fetched.set(user_id, user)
+        return user
+
+    def stats(self):
+        """Tier counters plus the LRU cache counters"""
+        stats = dict(self.counters)
+        stats["lru_cache"] = self.fetched.stats()
+        return stats